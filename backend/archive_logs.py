@@ -0,0 +1,16 @@
+import time
+from backend.models.database import Base, engine, ensure_indexes
+from backend.models.log import LogEntry
+from backend.services.log_retention import archive_logs, LOG_RETENTION_DAYS, LOG_ARCHIVE_DB
+
+# Move audit log entries older than LOG_RETENTION_DAYS into the archive
+# database, e.g. once after upgrading a database with a large logs table
+if __name__ == "__main__":
+    Base.metadata.create_all(bind=engine)
+    ensure_indexes()
+    start = time.time()
+    print(f"Archiving log entries older than {LOG_RETENTION_DAYS:g} days to {LOG_ARCHIVE_DB}...")
+    moved = archive_logs()
+    print(f"Archived {moved} log entries in {time.time() - start:.2f} seconds")
+
+# python -m backend.archive_logs
@@ -0,0 +1,24 @@
+import time
+from backend.models.database import Base, engine, SessionLocal
+from backend.models.contact import ContactDB, TransactionDB
+from backend.models.rollup import TransactionDailyRollup
+from backend.services.rollups import backfill
+
+# Rebuild transaction_daily_rollups from the transactions table, e.g. for a
+# database filled before rollups existed or edited by hand
+if __name__ == "__main__":
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        start = time.time()
+        print("Backfilling daily transaction rollups...")
+        days = backfill(db)
+        db.commit()
+        print(f"Rebuilt {days} daily rollups in {time.time() - start:.2f} seconds")
+    except Exception as e:
+        db.rollback()
+        print(f"Error backfilling rollups: {e}")
+    finally:
+        db.close()
+
+# python -m backend.backfill_rollups
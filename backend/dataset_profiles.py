@@ -0,0 +1,207 @@
+import json
+import os
+import random
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from itertools import accumulate
+from typing import Any, Dict, List, Optional
+
+# Data profiles for generate_large_dataset.py --fast.
+#
+# A profile describes the shape of the generated data; together with the
+# seed it fully determines the rows, so benchmarks can run against the same
+# dataset every time. Profiles are built in (below) or read from a YAML or
+# JSON file with the same keys; missing keys fall back to DEFAULT_PROFILE.
+
+DEFAULT_PROFILE: Dict[str, Any] = {
+    "seed": None,
+    "transactions": {
+        # "uniform": min..max per contact; "zipf": P(k) ~ 1 / k^exponent on
+        # min..max, so most contacts have a few and some have thousands
+        "distribution": "uniform",
+        "min": 1,
+        "max": 10,
+        "exponent": 2.0,
+        "amount_min": -1000,
+        "amount_max": 1000,
+    },
+    "dates": {
+        # Transactions fall on the last `days` days, weighted by month of the
+        # year (12 values, January first) and weekday (7 values, Monday first)
+        "days": 365,
+        # Last day of the range (ISO date or datetime); None means now, so
+        # pin it when datasets must be identical across runs
+        "end": None,
+        "month_weights": [1] * 12,
+        "weekday_weights": [1] * 7,
+        # Randomly placed bursts: `count` days with `factor` times the traffic
+        "bursts": {"count": 0, "factor": 1},
+    },
+    "tags": {
+        # None derives the tag from name and phone (nearly unique per
+        # contact); a number draws tags from that many distinct values
+        "cardinality": None,
+    },
+    # Optional users and audit log rows for the monitoring tables
+    "users": 0,
+    "logs": 0,
+}
+
+BUILTIN_PROFILES: Dict[str, Dict[str, Any]] = {
+    # What the generator has always produced
+    "uniform": {},
+    # Skewed like production: long-tailed activity per contact, busy
+    # weekdays and December, a handful of spikes, few distinct tags
+    "realistic": {
+        "transactions": {"distribution": "zipf", "min": 1, "max": 5000, "exponent": 2.0},
+        "dates": {
+            "month_weights": [0.8, 0.8, 0.9, 1, 1, 1, 0.9, 0.8, 1, 1.1, 1.3, 1.8],
+            "weekday_weights": [1.2, 1.1, 1.1, 1.1, 1.3, 0.6, 0.4],
+            "bursts": {"count": 6, "factor": 5},
+        },
+        "tags": {"cardinality": 50},
+        "users": 200,
+        "logs": 100000,
+    },
+}
+
+LOG_ACTIONS = ["create_contact", "update_contact", "delete_contact", "add_transaction", "delete_transaction"]
+
+
+def _merge(base: Dict[str, Any], overrides: Dict[str, Any]) -> Dict[str, Any]:
+    merged = dict(base)
+    for key, value in overrides.items():
+        if key not in base:
+            raise ValueError(f"Unknown profile setting '{key}'")
+        if isinstance(base[key], dict) and isinstance(value, dict):
+            merged[key] = _merge(base[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def _read_profile_file(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError("Reading YAML profiles requires PyYAML (pip install pyyaml), or use JSON")
+            return yaml.safe_load(f) or {}
+        return json.load(f)
+
+
+def load_profile(name_or_path: Optional[str] = None, overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Resolve a built-in profile name or a YAML/JSON file, then apply overrides"""
+    name_or_path = name_or_path or "uniform"
+    if name_or_path in BUILTIN_PROFILES:
+        settings = BUILTIN_PROFILES[name_or_path]
+    elif os.path.exists(name_or_path):
+        settings = _read_profile_file(name_or_path)
+    else:
+        raise ValueError(
+            f"Unknown profile '{name_or_path}': use one of {', '.join(BUILTIN_PROFILES)} or a YAML/JSON file"
+        )
+    profile = _merge(DEFAULT_PROFILE, settings)
+    profile = _merge(profile, overrides or {})
+    validate_profile(profile)
+    return profile
+
+
+def validate_profile(profile: Dict[str, Any]):
+    tx = profile["transactions"]
+    if tx["distribution"] not in ("uniform", "zipf"):
+        raise ValueError("transactions.distribution must be 'uniform' or 'zipf'")
+    if not 0 <= tx["min"] <= tx["max"]:
+        raise ValueError("transactions.min must be between 0 and transactions.max")
+    if tx["amount_min"] > tx["amount_max"]:
+        raise ValueError("transactions.amount_min must not exceed amount_max")
+    dates = profile["dates"]
+    try:
+        profile_end(profile)
+    except ValueError:
+        raise ValueError("dates.end must be an ISO date or datetime")
+    if dates["days"] < 1:
+        raise ValueError("dates.days must be at least 1")
+    if len(dates["month_weights"]) != 12 or len(dates["weekday_weights"]) != 7:
+        raise ValueError("dates.month_weights needs 12 values and dates.weekday_weights 7")
+    for key in ("month_weights", "weekday_weights"):
+        weights = dates[key]
+        if any(w < 0 for w in weights) or sum(weights) <= 0:
+            raise ValueError(f"dates.{key} must not be negative and must not all be 0")
+    bursts = dates["bursts"]
+    if bursts["count"] < 0 or bursts["factor"] < 0:
+        raise ValueError("dates.bursts.count and dates.bursts.factor must not be negative")
+    cardinality = profile["tags"]["cardinality"]
+    if cardinality is not None and cardinality < 1:
+        raise ValueError("tags.cardinality must be at least 1")
+    if profile["users"] < 0 or profile["logs"] < 0:
+        raise ValueError("users and logs must not be negative")
+    if profile["logs"] and not profile["users"]:
+        raise ValueError("logs need users to belong to")
+
+
+def profile_end(profile: Dict[str, Any]) -> datetime:
+    end = profile["dates"]["end"]
+    return datetime.fromisoformat(str(end)) if end is not None else datetime.now()
+
+
+class ProfileSampler:
+    """
+    Precomputed sampling tables for a profile.
+
+    Everything random is drawn from the `rng` passed in, so the caller's seed
+    decides the outcome; the tables themselves only depend on the profile
+    (and the `now` the date range ends at).
+    """
+
+    def __init__(self, profile: Dict[str, Any], now: datetime, burst_seed: int):
+        self.profile = profile
+        tx = profile["transactions"]
+        self.amount_min = tx["amount_min"]
+        self.amount_max = tx["amount_max"]
+
+        self.counts = list(range(tx["min"], tx["max"] + 1))
+        if tx["distribution"] == "zipf":
+            # Shifted so the smallest count gets the largest weight
+            weights = [1 / (k - tx["min"] + 1) ** tx["exponent"] for k in self.counts]
+        else:
+            weights = [1] * len(self.counts)
+        self.count_cum_weights = list(accumulate(weights))
+
+        dates = profile["dates"]
+        days = [now - timedelta(days=d) for d in range(dates["days"] + 1)]
+        day_weights = [
+            dates["month_weights"][day.month - 1] * dates["weekday_weights"][day.weekday()]
+            for day in days
+        ]
+        bursts = dates["bursts"]
+        if bursts["count"]:
+            burst_rng = random.Random(burst_seed)
+            for d in burst_rng.sample(range(len(days)), min(bursts["count"], len(days))):
+                day_weights[d] *= bursts["factor"]
+        self.days_back = list(range(len(days)))
+        self.day_cum_weights = list(accumulate(day_weights))
+        # Each weight list has a positive sum, but a short range can still
+        # fall entirely on zero-weight months or weekdays
+        if self.day_cum_weights[-1] <= 0:
+            raise ValueError("No day in the date range has a positive weight; check dates.days and the weights")
+
+        cardinality = profile["tags"]["cardinality"]
+        self.tags: Optional[List[str]] = (
+            [f"tag{i:0{len(str(cardinality))}d}" for i in range(1, cardinality + 1)] if cardinality else None
+        )
+
+    def transaction_count(self, rng) -> int:
+        # Equivalent to rng.choices(self.counts, cum_weights=...) without the list
+        x = rng.random() * self.count_cum_weights[-1]
+        return self.counts[min(bisect_left(self.count_cum_weights, x), len(self.counts) - 1)]
+
+    def days_back_sample(self, rng, k: int) -> List[int]:
+        return rng.choices(self.days_back, cum_weights=self.day_cum_weights, k=k)
+
+    def amount(self, rng) -> float:
+        return round(rng.uniform(self.amount_min, self.amount_max), 2)
+
+    def tag(self, rng, derived: str) -> str:
+        return rng.choice(self.tags) if self.tags else derived
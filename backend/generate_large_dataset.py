@@ -1,18 +1,46 @@
 import os
 import random
+import sqlite3
 import time
 import argparse  # Add argparse for command line arguments
+import multiprocessing
+import secrets
 from datetime import datetime, timedelta
+from itertools import accumulate
 from faker import Faker
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import text
+from sqlalchemy import text, func
 from models.database import engine, Base
 from models.contact import ContactDB, TransactionDB
+from models.rollup import TransactionDailyRollup
+from models.search import FTS_TABLE, INSERT_TRIGGER, rebuild_search_index
+from models.user import UserDB
+from models.log import LogEntry
+from services.rollups import record_transactions, backfill
+from dataset_profiles import BUILTIN_PROFILES, LOG_ACTIONS, ProfileSampler, load_profile, profile_end
 
 # Parse command line arguments
 parser = argparse.ArgumentParser(description='Generate large dataset for UBBank')
 parser.add_argument('--recreate-db', action='store_true', help='Recreate the database from scratch')
 parser.add_argument('--contacts', type=int, default=10000, help='Number of contacts to generate')
+parser.add_argument('--fast', action='store_true', help='Generate rows in parallel worker processes and bulk-load them')
+parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes for --fast')
+parser.add_argument('--chunk-size', type=int, default=10000, help='Contacts per worker task and per transaction for --fast')
+parser.add_argument('--seed', type=int, default=None,
+                    help='Random seed for --fast (same seed and chunk size, same data)')
+# Data profiles (imply --fast); the options below override single profile settings
+parser.add_argument('--profile', default=None,
+                    help=f"Data profile: {' or '.join(BUILTIN_PROFILES)}, or a YAML/JSON file (see dataset_profiles.py)")
+parser.add_argument('--max-transactions', type=int, default=None, help='Most transactions a contact can get')
+parser.add_argument('--zipf-exponent', type=float, default=None,
+                    help='Skew of transactions per contact (switches the profile to the zipf distribution)')
+parser.add_argument('--days', type=int, default=None, help='Days back transactions and logs are spread over')
+parser.add_argument('--end-date', default=None, help='Last day of that range (default: now)')
+parser.add_argument('--tag-cardinality', type=int, default=None, help='Distinct tags to draw from')
+parser.add_argument('--users', type=int, default=None, help='Target number of users')
+parser.add_argument('--logs', type=int, default=None, help='Target number of audit log entries')
+parser.add_argument('--user-password', default=os.environ.get("GENERATED_USER_PASSWORD"),
+                    help='Password of the generated users (default: $GENERATED_USER_PASSWORD, else a random one)')
 args = parser.parse_args()
 
 # Initialize Faker
@@ -82,6 +110,8 @@ def generate_contacts_batch(db, batch_size, start_id):
     """Generate a batch of contacts with transactions"""
     try:
         batch_start_time = time.time()
+        # (date, amount) of transactions not yet merged into the daily rollups
+        pending_rollups = []
         for i in range(batch_size):
             # Generate contact data
             name = fake.name()
@@ -114,12 +144,16 @@ def generate_contacts_batch(db, batch_size, start_id):
             # Add transactions to session
             for transaction in transactions:
                 db.add(transaction)
+                pending_rollups.append((transaction.date, transaction.amount))
             
             # Commit in smaller batches to avoid memory issues
             if i % 100 == 0 and i > 0:
+                record_transactions(db, pending_rollups)
+                pending_rollups = []
                 db.commit()
         
         # Final commit for this batch
+        record_transactions(db, pending_rollups)
         db.commit()
         batch_time = time.time() - batch_start_time
         write_to_time_file(f"Batch completed in {batch_time:.2f} seconds - {batch_size} contacts")
@@ -130,6 +164,248 @@ def generate_contacts_batch(db, batch_size, start_id):
         print(f"Error generating batch: {e}")
         raise
 
+# ---------------------------------------------------------------------------
+# Fast mode: worker processes build plain row tuples from precomputed
+# vocabularies (Faker runs only while building them), ids are assigned up
+# front, and the main process loads each chunk with executemany in one
+# transaction. Chunks are written in id order, so an interrupted run leaves
+# a complete prefix and simply continues from the highest id next time.
+# ---------------------------------------------------------------------------
+
+# Distinct names, emails, notes and sentences each worker samples from
+VOCABULARY_SIZE = 5000
+
+# SQLAlchemy's storage format for DateTime columns on SQLite
+SQLITE_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+CONTACT_INSERT = (
+    "INSERT INTO contacts (id, name, phone, email, notes, tag, last_transaction, video_url, created_at, updated_at) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, NULL, ?, ?)"
+)
+TRANSACTION_INSERT = "INSERT INTO transactions (amount, note, date, contact_id) VALUES (?, ?, ?, ?)"
+USER_INSERT = "INSERT INTO users (id, username, password_hash, created_at, role) VALUES (?, ?, ?, ?, 'user')"
+LOG_INSERT = "INSERT INTO logs (user_id, action, timestamp, details) VALUES (?, ?, ?, ?)"
+
+# Filled in each worker by init_fast_worker()
+_vocabulary = None
+_sampler = None
+
+def profile_overrides():
+    """Profile settings given on the command line"""
+    overrides = {}
+    transactions = {}
+    if args.max_transactions is not None:
+        transactions["max"] = args.max_transactions
+    if args.zipf_exponent is not None:
+        transactions.update(distribution="zipf", exponent=args.zipf_exponent)
+    if transactions:
+        overrides["transactions"] = transactions
+    dates = {}
+    if args.days is not None:
+        dates["days"] = args.days
+    if args.end_date is not None:
+        dates["end"] = args.end_date
+    if dates:
+        overrides["dates"] = dates
+    if args.tag_cardinality is not None:
+        overrides["tags"] = {"cardinality": args.tag_cardinality}
+    if args.users is not None:
+        overrides["users"] = args.users
+    if args.logs is not None:
+        overrides["logs"] = args.logs
+    if args.seed is not None:
+        overrides["seed"] = args.seed
+    return overrides
+
+def init_fast_worker(seed, profile, now):
+    """Build the vocabularies and sampling tables a worker uses; every worker gets the same ones"""
+    global _vocabulary, _sampler
+    _sampler = ProfileSampler(profile, now, burst_seed=seed)
+    worker_fake = Faker()
+    worker_fake.seed_instance(seed)
+    _vocabulary = {
+        "names": [worker_fake.name() for _ in range(VOCABULARY_SIZE)],
+        "emails": [worker_fake.email() for _ in range(VOCABULARY_SIZE)],
+        "notes": [worker_fake.text(max_nb_chars=100) for _ in range(VOCABULARY_SIZE // 5)],
+        "sentences": [worker_fake.sentence(nb_words=5) for _ in range(VOCABULARY_SIZE // 5)],
+    }
+
+def generate_fast_chunk(task):
+    """Generate the contact and transaction rows for ids first_id .. first_id + count - 1"""
+    first_id, count, seed, now = task
+    # Seeded per chunk, so the data doesn't depend on which worker ran it
+    rng = random.Random(seed * 1000003 + first_id)
+    names, emails = _vocabulary["names"], _vocabulary["emails"]
+    notes, sentences = _vocabulary["notes"], _vocabulary["sentences"]
+    sampler = _sampler
+    timestamp = now.strftime(SQLITE_DATETIME_FORMAT)
+    dates = [(now - timedelta(days=d)).strftime(SQLITE_DATETIME_FORMAT) for d in sampler.days_back]
+
+    contacts = []
+    transactions = []
+    for contact_id in range(first_id, first_id + count):
+        name = rng.choice(names)
+        phone = f"07{rng.randint(10000000, 99999999)}"
+        num_transactions = sampler.transaction_count(rng)
+        latest_day, last_transaction = len(dates), 0
+        for days_back in sampler.days_back_sample(rng, num_transactions):
+            amount = sampler.amount(rng)
+            if days_back < latest_day:
+                latest_day, last_transaction = days_back, amount
+            transactions.append((amount, rng.choice(sentences), dates[days_back], contact_id))
+        contacts.append((
+            contact_id, name, phone, rng.choice(emails), rng.choice(notes),
+            sampler.tag(rng, generate_tag(name, phone)), last_transaction, timestamp, timestamp
+        ))
+    return contacts, transactions
+
+def open_bulk_connection():
+    """Raw connection with durability relaxed for the load; an interrupted
+    run can be resumed, so losing the last commits on a crash is harmless"""
+    conn = sqlite3.connect(engine.url.database, isolation_level=None)
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA cache_size = -262144")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
+
+def drop_model_indices():
+    """Drop every index declared on the contacts and transactions models"""
+    for table in (ContactDB.__table__, TransactionDB.__table__):
+        for index in table.indexes:
+            index.drop(bind=engine, checkfirst=True)
+
+def create_model_indices():
+    for table in (ContactDB.__table__, TransactionDB.__table__):
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+def fts_exists(db):
+    return db.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+    ).first() is not None
+
+def generate_fast(db, start_id, contacts_to_generate, profile, seed, now):
+    """Generate contacts with a worker pool and bulk-load them chunk by chunk"""
+    write_to_time_file(f"Fast mode: {args.workers} workers, {args.chunk_size} contacts per chunk, seed {seed}")
+
+    # The search index is rebuilt once at the end instead of per row. Should
+    # the run die before that, the missing trigger makes the next run or the
+    # server's startup (create_search_index) rebuild it instead.
+    has_fts = fts_exists(db)
+    if has_fts:
+        db.execute(text(f"DROP TRIGGER IF EXISTS {INSERT_TRIGGER}"))
+    db.commit()
+
+    tasks = [
+        (first_id, min(args.chunk_size, start_id + contacts_to_generate - first_id), seed, now)
+        for first_id in range(start_id, start_id + contacts_to_generate, args.chunk_size)
+    ]
+    try:
+        conn = open_bulk_connection()
+        try:
+            with multiprocessing.Pool(args.workers, initializer=init_fast_worker, initargs=(seed, profile, now)) as pool:
+                for number, (contacts, transactions) in enumerate(pool.imap(generate_fast_chunk, tasks), 1):
+                    chunk_start = time.time()
+                    conn.execute("BEGIN")
+                    conn.executemany(CONTACT_INSERT, contacts)
+                    conn.executemany(TRANSACTION_INSERT, transactions)
+                    conn.execute("COMMIT")
+                    write_to_time_file(
+                        f"Chunk {number}/{len(tasks)} written in {time.time() - chunk_start:.2f} seconds - "
+                        f"{len(contacts)} contacts, {len(transactions)} transactions"
+                    )
+        finally:
+            conn.close()
+
+        rollup_start = time.time()
+        days = backfill(db)
+        db.commit()
+        write_to_time_file(f"Rebuilt {days} daily rollups in {time.time() - rollup_start:.2f} seconds")
+    finally:
+        # Also after a failed or interrupted load: the chunks written so far
+        # are in the table and must be searchable
+        if has_fts:
+            fts_start = time.time()
+            rebuild_search_index()
+            write_to_time_file(f"Search index rebuilt in {time.time() - fts_start:.2f} seconds")
+
+def generate_users(db, profile, seed, now):
+    """Add users until the profile's target is reached; they all share one password hash.
+
+    The password is --user-password, or a random one nobody knows when it
+    isn't given. It is never printed or written to the time file.
+    """
+    current_count = db.query(UserDB).count()
+    users_to_generate = max(0, profile["users"] - current_count)
+    if not users_to_generate:
+        return
+    # Imported here: hashing is only needed when users are generated
+    from services.passwords import pwd_context
+    password_hash = pwd_context.hash(args.user_password or secrets.token_urlsafe(16))
+
+    start_id = (db.query(func.max(UserDB.id)).scalar() or 0) + 1
+    rng = random.Random(seed * 1000003 - start_id)
+    users = [
+        (user_id, f"user{user_id:06d}", password_hash,
+         (now - timedelta(days=rng.randrange(profile["dates"]["days"] + 1))).strftime(SQLITE_DATETIME_FORMAT))
+        for user_id in range(start_id, start_id + users_to_generate)
+    ]
+    conn = open_bulk_connection()
+    try:
+        conn.execute("BEGIN")
+        conn.executemany(USER_INSERT, users)
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+    write_to_time_file(f"Generated {users_to_generate} users")
+    if not args.user_password:
+        print("Generated users have a random password; pass --user-password to log in as them")
+
+def generate_logs(db, profile, seed, now):
+    """Add audit log entries until the profile's target is reached.
+
+    A few users do most of the work (Zipf-like, like the transactions) and
+    entries follow the profile's seasonality; they are inserted in time order
+    so ids grow with timestamps, as they do for real entries."""
+    current_count = db.query(LogEntry).count()
+    logs_to_generate = max(0, profile["logs"] - current_count)
+    if not logs_to_generate:
+        return
+    user_ids = [user_id for user_id, in db.query(UserDB.id).order_by(UserDB.id)]
+    max_contact_id = db.query(func.max(ContactDB.id)).scalar() or 1
+    if not user_ids:
+        write_to_time_file("No users to generate log entries for")
+        return
+
+    log_start = time.time()
+    rng = random.Random(seed * 1000003 - current_count - 1)
+    rng.shuffle(user_ids)
+    user_cum_weights = list(accumulate(1 / rank for rank in range(1, len(user_ids) + 1)))
+    sampler = ProfileSampler(profile, now, burst_seed=seed)
+    days_back = sampler.days_back_sample(rng, logs_to_generate)
+    timestamps = sorted(
+        now - timedelta(days=days, seconds=rng.randrange(86400)) for days in days_back
+    )
+    logs = [
+        (rng.choices(user_ids, cum_weights=user_cum_weights)[0], rng.choice(LOG_ACTIONS),
+         timestamp.strftime(SQLITE_DATETIME_FORMAT), f"Contact ID: {rng.randint(1, max_contact_id)}")
+        for timestamp in timestamps
+    ]
+
+    for index in LogEntry.__table__.indexes:
+        index.drop(bind=engine, checkfirst=True)
+    conn = open_bulk_connection()
+    try:
+        for start in range(0, len(logs), args.chunk_size):
+            conn.execute("BEGIN")
+            conn.executemany(LOG_INSERT, logs[start:start + args.chunk_size])
+            conn.execute("COMMIT")
+    finally:
+        conn.close()
+    for index in LogEntry.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
+    write_to_time_file(f"Generated {logs_to_generate} log entries in {time.time() - log_start:.2f} seconds")
+
 def drop_indices(db):
     """Drop indices before bulk insert for better performance"""
     try:
@@ -192,6 +468,19 @@ def main():
             os.remove("ubbank.db")
             Base.metadata.create_all(bind=engine)
     
+    if args.profile is not None:
+        args.fast = True
+    if args.fast:
+        try:
+            profile = load_profile(args.profile, profile_overrides())
+            seed = profile["seed"] if profile["seed"] is not None else random.randrange(2 ** 31)
+            now = profile_end(profile)
+            # Built once here so a date range with no weight fails now, not in the workers
+            ProfileSampler(profile, now, burst_seed=seed)
+        except ValueError as e:
+            parser.error(str(e))
+        write_to_time_file(f"Profile: {args.profile or 'uniform'}, seed {seed}")
+
     db = SessionLocal()
     try:
         # Get current contact count
@@ -208,21 +497,30 @@ def main():
             # Drop indices before bulk insert
             drop_indices(db)
             
-            # Generate data in batches
-            num_batches = contacts_to_generate // BATCH_SIZE
-            if contacts_to_generate % BATCH_SIZE > 0:
-                num_batches += 1
-            
-            for batch in range(num_batches):
-                batch_size = min(BATCH_SIZE, contacts_to_generate - batch * BATCH_SIZE)
-                print(f"Generating batch {batch+1}/{num_batches} ({batch_size} contacts)...")
-                write_to_time_file(f"Starting batch {batch+1}/{num_batches} ({batch_size} contacts)...")
-                batch_start = time.time()
-                generate_contacts_batch(db, batch_size, current_count + batch * BATCH_SIZE)
-                print(f"Batch {batch+1} completed in {time.time() - batch_start:.2f} seconds")
+            if args.fast:
+                # Every secondary index goes, so the load only appends to tables
+                drop_model_indices()
+                # Ids continue after the highest existing one
+                max_id = db.query(func.max(ContactDB.id)).scalar() or 0
+                generate_fast(db, max_id + 1, contacts_to_generate, profile, seed, now)
+            else:
+                # Generate data in batches
+                num_batches = contacts_to_generate // BATCH_SIZE
+                if contacts_to_generate % BATCH_SIZE > 0:
+                    num_batches += 1
+                
+                for batch in range(num_batches):
+                    batch_size = min(BATCH_SIZE, contacts_to_generate - batch * BATCH_SIZE)
+                    print(f"Generating batch {batch+1}/{num_batches} ({batch_size} contacts)...")
+                    write_to_time_file(f"Starting batch {batch+1}/{num_batches} ({batch_size} contacts)...")
+                    batch_start = time.time()
+                    generate_contacts_batch(db, batch_size, current_count + batch * BATCH_SIZE)
+                    print(f"Batch {batch+1} completed in {time.time() - batch_start:.2f} seconds")
             
             # Create indices after bulk insert
             create_indices(db)
+            if args.fast:
+                create_model_indices()
             
             # VACUUM to optimize database size
             vacuum_start = time.time()
@@ -230,6 +528,10 @@ def main():
             db.commit()
             vacuum_time = time.time() - vacuum_start
             write_to_time_file(f"VACUUM completed in {vacuum_time:.2f} seconds")
+
+        if args.fast:
+            generate_users(db, profile, seed, now)
+            generate_logs(db, profile, seed, now)
         
         # Generate some statistics
         contact_count = db.query(ContactDB).count()
@@ -259,4 +561,6 @@ def main():
 if __name__ == "__main__":
     main() 
 
-# python generate_large_dataset.py
\ No newline at end of file
+# python generate_large_dataset.py
+# python generate_large_dataset.py --fast --contacts 1000000 --seed 42
+# python generate_large_dataset.py --profile realistic --contacts 100000 --seed 42
\ No newline at end of file
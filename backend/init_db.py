@@ -5,9 +5,11 @@ import random
 from datetime import datetime, timedelta
 import json
 from backend.models.user import UserDB
-from passlib.context import CryptContext
+from backend.services.passwords import pwd_context
 from backend.models.log import LogEntry
 from backend.models.monitored_user import MonitoredUser
+from backend.models.rollup import TransactionDailyRollup
+from backend.services.rollups import record_transactions
 
 # Create all tables
 Base.metadata.create_all(bind=engine)
@@ -109,6 +111,7 @@ def populate_initial_contacts():
             
             # Now create transactions for this contact
             transactions = generate_random_transactions(db, contact.id)
+            record_transactions(db, [(t.date, t.amount) for t in transactions])
             added_contacts.append(contact)
         
         db.commit()
@@ -124,7 +127,6 @@ def create_admin_user():
     from backend.models.user import UserDB
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
     db = SessionLocal()
-    pwd_context = CryptContext(schemes=["sha256_crypt"], deprecated="auto")
     try:
         existing = db.query(UserDB).filter_by(username="admin").first()
         if not existing:
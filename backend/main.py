@@ -1,12 +1,13 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, UploadFile, File, HTTPException
+from fastapi import FastAPI, Depends, Request, WebSocket, WebSocketDisconnect, UploadFile, File, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+import anyio.to_thread
 from pathlib import Path
 import asyncio
 import json
 import csv
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import os
 from backend.routes.contacts import router as contacts_router
 from backend.routes.analytics import router as analytics_router
@@ -14,15 +15,36 @@ from backend.routes.auth import router as auth_router
 from backend.routes.admin import router as admin_router
 from datetime import datetime
 import io
-from backend.models.database import Base, engine
+import tempfile
+import zlib
+from backend.models.database import Base, engine, ensure_indexes, storage_profile, DB_THREADPOOL_SIZE
 from backend.models.contact import ContactCreate, TransactionCreate
-from backend.services.monitoring import start_monitoring_thread
+from backend.models.search import create_search_index
+from backend.models.rollup import TransactionDailyRollup
+from backend.services.rollups import ensure_backfilled
+from backend.services.monitoring import start_monitoring_thread, activity_monitor
+from backend.services.audit_log import audit_log
+from backend.services.passwords import password_hasher
+from backend.utils.auth import principal_cache, require_admin
+from backend.services.log_retention import start_archive_thread
+from backend.services.analytics_cache import analytics_cache
+from backend.services.jobs import job_manager
+from backend.services.uploads import store_upload, UploadStaticFiles, UploadTooLarge, InvalidUpload
+from backend.services.events import event_bus, create_backend
+from backend.services.websocket import manager
+from backend.services.admission import AdmissionMiddleware, admission
 
 # Create database tables on startup
 Base.metadata.create_all(bind=engine)
+ensure_indexes()
+create_search_index()
 
 app = FastAPI(title="UBBank API")
 
+# Rate limits and per-route-class concurrency limits; added before CORS so
+# that rejections still carry the CORS headers
+app.add_middleware(AdmissionMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -37,179 +59,179 @@ UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
 
 # Mount uploads directory
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
-
-# WebSocket connection manager
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-
-    def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-
-    async def broadcast(self, message: str):
-        # Create a copy of the list to safely iterate over
-        connections = self.active_connections.copy()
-        for connection in connections:
-            try:
-                await connection.send_text(message)
-            except WebSocketDisconnect:
-                self.disconnect(connection)
-            except Exception:
-                # Handle any other exceptions that might occur
-                self.disconnect(connection)
-
-manager = ConnectionManager()
-
-# Background task for generating random contacts
-async def generate_random_contacts():
-    while True:
-        await asyncio.sleep(10)  # Generate new contact every 10 seconds
-        # Generate random contact logic here
-        new_contact = {
-            "name": "Auto Generated Contact",
-            "phone": "1234567890",
-            "email": "auto@example.com",
-            "notes": "Generated automatically"
-        }
-        await manager.broadcast(json.dumps({"type": "new_contact", "data": new_contact}))
+app.mount("/uploads", UploadStaticFiles(directory="uploads"), name="uploads")
+
 
 @app.on_event("startup")
 async def startup_event():
+    # Route handlers that touch the database are plain `def` functions, which
+    # FastAPI runs in AnyIO's worker threads; bound that pool to what the
+    # database connection pool can serve
+    anyio.to_thread.current_default_thread_limiter().total_tokens = DB_THREADPOOL_SIZE
+    print(f"SQLite storage profile: {storage_profile()}")
+
     # Initialize database
     from backend.init_db import populate_initial_contacts
+    from backend.models.database import SessionLocal
     populate_initial_contacts()
     
-    # Start WebSocket task
-    asyncio.create_task(generate_random_contacts())
+    # Databases created before the daily rollups existed get them built once
+    db = SessionLocal()
+    try:
+        if ensure_backfilled(db):
+            db.commit()
+            print("Backfilled daily transaction rollups")
+    finally:
+        db.close()
+    
+    # Deliver change events and job progress to WebSocket subscribers; they
+    # are published from worker threads, so hop back onto the event loop
+    loop = asyncio.get_running_loop()
+    app.state.unsubscribe_events = event_bus.subscribe(
+        lambda topics, message: loop.call_soon_threadsafe(manager.publish, topics, message)
+    )
+    # With several workers, EVENT_BUS_BACKEND=sqlite shares events between them
+    event_bus.start(create_backend())
+    
     # Start monitoring thread
     start_monitoring_thread()
+    # Move old audit log entries to the archive database periodically
+    start_archive_thread()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    job_manager.shutdown()
+    password_hasher.shutdown()
+    # Write the audit log records still queued; both wait on background
+    # threads, so they run off the event loop
+    await anyio.to_thread.run_sync(audit_log.stop)
+    await anyio.to_thread.run_sync(event_bus.stop)
+    app.state.unsubscribe_events()
+
+@app.get("/api/metrics", dependencies=[Depends(require_admin)])
+async def get_metrics():
+    """Queue depths and counters of the background pipelines"""
+    # Runs on the event loop, which owns the WebSocket manager state
+    return {
+        "audit_log": audit_log.stats(),
+        "websocket": manager.stats(),
+        "analytics_cache": analytics_cache.stats(),
+        "monitoring": activity_monitor.stats(),
+        "password_hasher": password_hasher.stats(),
+        "principal_cache": principal_cache.stats(),
+        "admission": admission.stats()
+    }
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
+    await manager.serve(websocket)
+
+# The body is parsed by store_upload() as it streams in, so describe the
+# form for the API docs here
+UPLOAD_REQUEST_BODY = {
+    "required": True,
+    "content": {"multipart/form-data": {"schema": {
+        "type": "object",
+        "properties": {"file": {"type": "string", "format": "binary"}},
+        "required": ["file"]
+    }}}
+}
+
+@app.post("/api/upload", openapi_extra={"requestBody": UPLOAD_REQUEST_BODY})
+async def upload_file(request: Request):
     try:
-        while True:
-            data = await websocket.receive_text()
-            await manager.broadcast(data)
-    except WebSocketDisconnect:
-        manager.disconnect(websocket)
-
-@app.post("/api/upload")
-async def upload_file(file: UploadFile = File(...)):
-    file_path = UPLOAD_DIR / file.filename
-    with open(file_path, "wb") as buffer:
-        content = await file.read()
-        buffer.write(content)
-    return {"filename": file.filename, "path": f"/uploads/{file.filename}"}
+        return await store_upload(request, UPLOAD_DIR)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except InvalidUpload as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-@app.get("/api/export-contacts")
-async def export_contacts():
-    export_path = UPLOAD_DIR / "contacts_export.csv"
-    
-    # Import the db_store to get all contacts
+# Contacts are read and written to the CSV this many rows at a time
+EXPORT_CHUNK_SIZE = 1000
+
+EXPORT_HEADER = [
+    'ID', 'Name', 'Phone', 'Email', 'Notes', 'Tag', 
+    'Last Transaction', 'Creation Date', 'Last Update'
+]
+
+def generate_export_csv(updated_since: Optional[datetime] = None, compress: bool = False):
+    """Yield the contacts CSV chunk by chunk, optionally gzip-compressed.
+
+    Rows are streamed from the database in EXPORT_CHUNK_SIZE batches, so memory
+    use stays flat however many contacts there are.
+    """
     from backend.store.db_store import db_store
     from backend.models.database import SessionLocal
     
+    compressor = zlib.compressobj(wbits=31) if compress else None  # wbits=31 writes a gzip container
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    
+    def flush():
+        data = buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+        return compressor.compress(data) if compressor else data
+    
     db = SessionLocal()
     try:
-        # Use get_all_contacts without pagination to get all contacts
-        contacts = db_store.get_all_contacts(db, search="", sort_by="id")
-        
-        # Get the total count for logging
-        total_count = db_store.get_contacts_count(db)
-        print(f"Found {len(contacts)} contacts for export (total in DB: {total_count})")
-        
-        with open(export_path, mode='w', newline='') as file:
-            writer = csv.writer(file)
-            # Write header
-            writer.writerow([
-                'ID', 'Name', 'Phone', 'Email', 'Notes', 'Tag', 
-                'Last Transaction', 'Creation Date', 'Last Update'
-            ])
-            
-            # Write data
-            for contact in contacts:
-                writer.writerow([
-                    contact['id'],
-                    contact['name'],
-                    contact['phone'],
-                    contact['email'],
-                    contact['notes'],
-                    contact['tag'],
-                    contact['last_transaction'],
-                    contact['created_at'],
-                    contact['updated_at']
-                ])
-        
-        return FileResponse(
-            path=export_path, 
-            filename="contacts_export.csv",
-            media_type="text/csv"
-        )
+        writer.writerow(EXPORT_HEADER)
+        for rows in db_store.iter_contact_rows(db, updated_since=updated_since, chunk_size=EXPORT_CHUNK_SIZE):
+            writer.writerows(rows)
+            chunk = flush()
+            if chunk:
+                yield chunk
+        chunk = flush()
+        if compressor:
+            chunk += compressor.flush()
+        if chunk:
+            yield chunk
     finally:
         db.close()
 
-@app.post("/api/import-contacts")
-async def import_contacts(file: UploadFile = File(...)):
+@app.get("/api/export-contacts")
+def export_contacts(
+    updated_since: Optional[datetime] = Query(None, description="Only export contacts updated at or after this time"),
+    gzip: bool = Query(False, description="Compress the export with gzip")
+):
+    filename = "contacts_export.csv.gz" if gzip else "contacts_export.csv"
+    return StreamingResponse(
+        generate_export_csv(updated_since, compress=gzip),
+        media_type="application/gzip" if gzip else "text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+# Uploads are copied to a temporary file in chunks of this size before the
+# import job picks them up
+IMPORT_COPY_CHUNK_SIZE = 1024 * 1024
+
+@app.post("/api/import-contacts", status_code=202)
+async def import_contacts(
+    file: UploadFile = File(...),
+    upsert_on: Optional[str] = Query(None, pattern="^(phone|email)$", description="Update contacts matching on 'phone' or 'email' instead of duplicating them")
+):
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="Only CSV files are supported")
     
-    # Import necessary modules
-    from backend.models.contact import ContactCreate
-    from backend.store.db_store import db_store
-    from backend.models.database import SessionLocal
-    
-    db = SessionLocal()
+    # The upload is gone once this request ends, so hand the job its own copy
+    fd, path = tempfile.mkstemp(prefix="import-", suffix=".csv")
     try:
-        # Read the CSV file
-        contents = await file.read()
-        decoded = contents.decode('utf-8')
-        csv_reader = csv.DictReader(io.StringIO(decoded))
-        
-        new_contacts = []
-        
-        # Process each row
-        for row in csv_reader:
-            # Validate required fields
-            if not all(key in row for key in ['name', 'phone', 'email']):
-                continue
-                
-            # Create contact object
-            contact_data = ContactCreate(
-                name=row['name'],
-                phone=row['phone'],
-                email=row['email'],
-                notes=row.get('notes', ''),
-                tag=row.get('tag', ''),
-                last_transaction=float(row.get('last_transaction', 0))
-            )
-            
-            # Add to database
-            created_contact = db_store.create_contact(db, contact_data)
-            
-            # Add initial transaction if last_transaction is not 0
-            if float(row.get('last_transaction', 0)) != 0:
-                transaction_data = TransactionCreate(
-                    amount=float(row.get('last_transaction', 0)),
-                    note="Initial transaction from import"
-                )
-                db_store.add_transaction(db, created_contact['id'], transaction_data)
-            
-            new_contacts.append(created_contact)
-            
-        return {"message": f"Successfully imported {len(new_contacts)} contacts", "contacts": new_contacts}
-        
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Failed to import contacts: {str(e)}")
-    finally:
-        db.close()
+        with os.fdopen(fd, "wb") as out:
+            while chunk := await file.read(IMPORT_COPY_CHUNK_SIZE):
+                await run_in_threadpool(out.write, chunk)
+    except Exception:
+        os.remove(path)
+        raise
+    
+    job = job_manager.submit_import(path, file.filename, upsert_on=upsert_on)
+    return {"message": "Import started", "job_id": job.id, "status_url": f"/api/jobs/{job.id}"}
+
+@app.get("/api/jobs/{job_id}")
+def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 # Include the contacts router
 app.include_router(contacts_router, prefix="/api")
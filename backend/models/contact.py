@@ -3,7 +3,7 @@ from typing import List, Optional, Dict, Any
 from datetime import datetime
 import re
 import json
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .database import Base
@@ -21,6 +21,17 @@ class TransactionDB(Base):
     # Relationship to Contact
     contact = relationship("ContactDB", back_populates="transactions")
 
+    # Covering indexes for the analytics queries: period scans read
+    # (date, amount), per-contact aggregates over a period read
+    # (date, contact_id, amount) from the period's range only, and all-time
+    # or per-contact reads use (contact_id, date, amount), all without
+    # touching the table
+    __table_args__ = (
+        Index("ix_transactions_date_amount", "date", "amount"),
+        Index("ix_transactions_date_contact_amount", "date", "contact_id", "amount"),
+        Index("ix_transactions_contact_date_amount", "contact_id", "date", "amount"),
+    )
+
     def to_dict(self) -> Dict[str, Any]:
         return {
             "id": self.id,
@@ -35,15 +46,16 @@ class ContactDB(Base):
     __tablename__ = "contacts"
 
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String(100), nullable=False)
-    phone = Column(String(15), nullable=False)
-    email = Column(String(100), nullable=False)
+    # Sortable columns are indexed so keyset pagination can seek instead of scan
+    name = Column(String(100), nullable=False, index=True)
+    phone = Column(String(15), nullable=False, index=True)
+    email = Column(String(100), nullable=False, index=True)
     notes = Column(Text, nullable=True)
-    tag = Column(String(50), nullable=True)
-    last_transaction = Column(Float, default=0)
+    tag = Column(String(50), nullable=True, index=True)
+    last_transaction = Column(Float, default=0, index=True)
     video_url = Column(String(255), nullable=True)
-    created_at = Column(DateTime, default=datetime.now)
-    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    created_at = Column(DateTime, default=datetime.now, index=True)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now, index=True)
     
     # Relationship to Transaction - one-to-many (one contact can have many transactions)
     transactions = relationship("TransactionDB", back_populates="contact", cascade="all, delete-orphan")
@@ -1,21 +1,81 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+import os
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 # Create SQLite database URL
 SQLALCHEMY_DATABASE_URL = "sqlite:///./ubbank.db"
 
+# Number of worker threads that may run blocking database calls at once
+DB_THREADPOOL_SIZE = int(os.environ.get("DB_THREADPOOL_SIZE", "15"))
+
+# Connection pool: one connection per worker thread, plus overflow for the
+# background threads (monitoring, startup tasks)
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", str(DB_THREADPOOL_SIZE)))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "5"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+
+# SQLite storage profile, applied to every pooled connection.
+# WAL lets readers run alongside the writer; synchronous=NORMAL is durable in
+# WAL mode except for the last commits on power loss.
+SQLITE_PRAGMAS = {
+    "journal_mode": os.environ.get("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "cache_size": int(os.environ.get("SQLITE_CACHE_SIZE", "-65536")),  # negative = KiB, i.e. 64 MiB
+    "mmap_size": int(os.environ.get("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "temp_store": os.environ.get("SQLITE_TEMP_STORE", "MEMORY"),
+}
+
 # Create engine
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT
 )
 
+@event.listens_for(engine, "connect")
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+    finally:
+        cursor.close()
+
+def storage_profile():
+    """Report the pragma values actually active on a pooled connection and the pool settings"""
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        active = {}
+        for name in SQLITE_PRAGMAS:
+            active[name] = cursor.execute(f"PRAGMA {name}").fetchone()[0]
+        cursor.close()
+    finally:
+        raw.close()
+    active.update({
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "threadpool_size": DB_THREADPOOL_SIZE
+    })
+    return active
+
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # Create Base class
 Base = declarative_base()
 
+# Create indexes declared on models that are missing from an existing database.
+# create_all() only creates indexes together with new tables.
+def ensure_indexes():
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
 # Function to get a database session
 def get_db():
     db = SessionLocal()
@@ -1,12 +1,18 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Index
 from datetime import datetime
 from .database import Base
 
 class LogEntry(Base):
     __tablename__ = "logs"
+    # Time-range scans (retention, admin log view) and per-user windows
+    __table_args__ = (
+        Index("ix_logs_timestamp", "timestamp"),
+        Index("ix_logs_user_timestamp", "user_id", "timestamp"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     action = Column(String(100), nullable=False)
     timestamp = Column(DateTime, default=datetime.now)
-    details = Column(Text, nullable=True) 
\ No newline at end of file
+    details = Column(Text, nullable=True)
+
@@ -7,5 +7,5 @@ class MonitoredUser(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, unique=True)
-    detected_at = Column(DateTime, default=datetime.now)
+    detected_at = Column(DateTime, default=datetime.now, index=True)
     reason = Column(String(255), nullable=False) 
\ No newline at end of file
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, Float, Date
+from .database import Base
+
+class TransactionDailyRollup(Base):
+    """Per-day transaction aggregates, maintained by services/rollups.py"""
+    __tablename__ = "transaction_daily_rollups"
+
+    day = Column(Date, primary_key=True)
+    transaction_count = Column(Integer, nullable=False, default=0)
+    total_amount = Column(Float, nullable=False, default=0)
+    positive_count = Column(Integer, nullable=False, default=0)
+    negative_count = Column(Integer, nullable=False, default=0)
+    min_amount = Column(Float, nullable=True)
+    max_amount = Column(Float, nullable=True)
@@ -0,0 +1,113 @@
+from sqlalchemy import text, or_, and_, column
+from sqlalchemy.engine import Engine
+
+from .database import engine
+from .contact import ContactDB
+
+# FTS5 index over the searchable contact columns. It is an external content
+# table, so the text lives only in `contacts` and the index holds trigrams.
+# The trigram tokenizer matches arbitrary substrings, which keeps the
+# behaviour of the old '%term%' searches (including partial phone numbers).
+FTS_TABLE = "contacts_fts"
+
+# Trigram queries need at least three characters to hit the index
+MIN_FTS_TERM_LENGTH = 3
+
+# Dropped by bulk loads (generate_large_dataset.py --fast) while they run
+INSERT_TRIGGER = "contacts_fts_ai"
+
+SEARCH_INDEX_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, phone, tag,
+        content='contacts', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {INSERT_TRIGGER} AFTER INSERT ON contacts BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, phone, tag)
+        VALUES (new.id, new.name, new.phone, new.tag);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS contacts_fts_ad AFTER DELETE ON contacts BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, phone, tag)
+        VALUES ('delete', old.id, old.name, old.phone, old.tag);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS contacts_fts_au AFTER UPDATE OF name, phone, tag ON contacts BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, phone, tag)
+        VALUES ('delete', old.id, old.name, old.phone, old.tag);
+        INSERT INTO {FTS_TABLE}(rowid, name, phone, tag)
+        VALUES (new.id, new.name, new.phone, new.tag);
+    END
+    """,
+]
+
+# Set by create_search_index(); stays False when SQLite lacks FTS5/trigram
+fts_enabled = False
+
+
+def create_search_index(bind: Engine = engine) -> bool:
+    """Create the FTS table and its sync triggers if they don't exist yet.
+
+    A freshly created index is filled from the existing contacts, and so is
+    one whose insert trigger is missing: a bulk load that drops it and was
+    interrupted before rebuilding left contacts the index doesn't know about.
+    Returns whether full-text search is available on this SQLite build.
+    """
+    global fts_enabled
+    try:
+        with bind.begin() as conn:
+            existing = {
+                row.name for row in conn.execute(
+                    text("SELECT name FROM sqlite_master WHERE name IN (:table, :trigger)"),
+                    {"table": FTS_TABLE, "trigger": INSERT_TRIGGER}
+                )
+            }
+            for statement in SEARCH_INDEX_DDL:
+                conn.exec_driver_sql(statement)
+            if existing != {FTS_TABLE, INSERT_TRIGGER}:
+                conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        fts_enabled = True
+    except Exception as e:
+        print(f"Full-text search unavailable, falling back to LIKE search: {e}")
+        fts_enabled = False
+    return fts_enabled
+
+
+def rebuild_search_index(bind: Engine = engine) -> None:
+    """Rebuild the whole FTS index from the contacts table"""
+    create_search_index(bind)
+    with bind.begin() as conn:
+        conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+
+
+def _like_filter(search: str):
+    return or_(
+        ContactDB.name.ilike(f"%{search}%"),
+        ContactDB.phone.ilike(f"%{search}%"),
+        ContactDB.tag.ilike(f"%{search}%")
+    )
+
+
+def contact_search_filter(search: str):
+    """Filter clause matching contacts whose name, phone or tag contain `search`.
+
+    The FTS index narrows the candidates and the LIKE check runs only on those
+    rows, so results are identical to the plain LIKE search. Terms too short
+    for trigrams, or containing LIKE wildcards, use the plain LIKE search.
+    """
+    search = search.lower()
+    if (not fts_enabled or len(search) < MIN_FTS_TERM_LENGTH
+            or "%" in search or "_" in search):
+        return _like_filter(search)
+
+    # Quote the term so FTS5 treats it as a literal string
+    fts_query = '"' + search.replace('"', '""') + '"'
+    matches = text(
+        f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :fts_query"
+    ).bindparams(fts_query=fts_query).columns(column("rowid"))
+    return and_(ContactDB.id.in_(matches), _like_filter(search))
@@ -0,0 +1,15 @@
+import time
+from backend.models.database import Base, engine
+from backend.models.contact import ContactDB
+from backend.models.search import rebuild_search_index
+
+# Rebuild the contacts full-text search index, e.g. after restoring an old
+# database or bulk-loading contacts with the triggers missing
+if __name__ == "__main__":
+    Base.metadata.create_all(bind=engine)
+    start = time.time()
+    print("Rebuilding contact search index...")
+    rebuild_search_index()
+    print(f"Search index rebuilt in {time.time() - start:.2f} seconds")
+
+# python -m backend.rebuild_search_index
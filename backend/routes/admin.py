@@ -1,21 +1,110 @@
-from fastapi import APIRouter, Depends
+import re
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import case, func
 from sqlalchemy.orm import Session
 from backend.models.database import get_db
+from backend.models.log import LogEntry
 from backend.models.monitored_user import MonitoredUser
 from backend.models.user import UserDB
+from backend.services.log_retention import get_logs_page
+from backend.utils.auth import require_admin
 
-router = APIRouter()
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+# Windows for per-user action counts, e.g. "15m", "1h", "7d"
+WINDOW_PATTERN = re.compile(r"^(\d{1,4})([mhd])$")
+WINDOW_UNITS = {"m": "minutes", "h": "hours", "d": "days"}
+MAX_WINDOWS = 5
+
+def parse_windows(windows: str) -> Dict[str, timedelta]:
+    parsed = {}
+    for window in filter(None, (w.strip() for w in windows.split(","))):
+        match = WINDOW_PATTERN.match(window)
+        if not match or int(match.group(1)) == 0:
+            raise ValueError(f"Invalid window '{window}', expected e.g. 15m, 1h or 7d")
+        parsed[window] = timedelta(**{WINDOW_UNITS[match.group(2)]: int(match.group(1))})
+    if len(parsed) > MAX_WINDOWS:
+        raise ValueError(f"At most {MAX_WINDOWS} windows are allowed")
+    return parsed
+
+def action_counts(db: Session, user_ids: List[int], windows: Dict[str, timedelta]) -> Dict[int, Dict[str, int]]:
+    """Actions per user in each window, in one grouped query over the (user_id, timestamp) index"""
+    if not user_ids or not windows:
+        return {}
+    now = datetime.now()
+    starts = {name: now - delta for name, delta in windows.items()}
+    columns = [
+        func.sum(case((LogEntry.timestamp >= start, 1), else_=0)).label(name)
+        for name, start in starts.items()
+    ]
+    rows = (
+        db.query(LogEntry.user_id, *columns)
+        .filter(LogEntry.user_id.in_(user_ids), LogEntry.timestamp >= min(starts.values()))
+        .group_by(LogEntry.user_id)
+        .all()
+    )
+    return {row[0]: {name: int(row[i + 1] or 0) for i, name in enumerate(starts)} for row in rows}
 
 @router.get("/monitored-users")
-async def get_monitored_users(db: Session = Depends(get_db)):
-    monitored = db.query(MonitoredUser).all()
+def get_monitored_users(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[int] = Query(None, description="next_cursor from the previous page"),
+    detected_since: Optional[datetime] = None,
+    detected_until: Optional[datetime] = None,
+    reason: Optional[str] = Query(None, description="Only entries whose reason contains this text"),
+    windows: str = Query("1h,24h", description="Comma-separated windows to count actions in, e.g. '15m,1h,7d'"),
+    db: Session = Depends(get_db)
+):
+    """Monitored users, most recently detected first, with their recent activity"""
+    try:
+        parsed_windows = parse_windows(windows)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    query = (
+        db.query(MonitoredUser, UserDB.username)
+        .outerjoin(UserDB, UserDB.id == MonitoredUser.user_id)
+    )
+    if detected_since is not None:
+        query = query.filter(MonitoredUser.detected_at >= detected_since)
+    if detected_until is not None:
+        query = query.filter(MonitoredUser.detected_at < detected_until)
+    if reason:
+        query = query.filter(MonitoredUser.reason.ilike(f"%{reason}%"))
+    if cursor is not None:
+        query = query.filter(MonitoredUser.id < cursor)
+    rows = query.order_by(MonitoredUser.id.desc()).limit(limit + 1).all()
+
+    next_cursor = rows[limit - 1][0].id if len(rows) > limit else None
+    rows = rows[:limit]
+    counts = action_counts(db, [m.user_id for m, _ in rows], parsed_windows)
+
     result = []
-    for m in monitored:
-        user = db.query(UserDB).filter_by(id=m.user_id).first()
+    for m, username in rows:
         result.append({
             "user_id": m.user_id,
-            "username": user.username if user else None,
+            "username": username,
             "detected_at": m.detected_at,
-            "reason": m.reason
+            "reason": m.reason,
+            "action_counts": counts.get(m.user_id, dict.fromkeys(parsed_windows, 0))
         })
-    return {"monitored_users": result}
\ No newline at end of file
+    return {"monitored_users": result, "next_cursor": next_cursor}
+
+@router.get("/logs")
+def get_logs(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[int] = Query(None, description="next_cursor from the previous page"),
+    user_id: Optional[int] = None,
+    action: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    include_archive: bool = True,
+    db: Session = Depends(get_db)
+):
+    """Audit log entries, newest first, from the live table and the archive"""
+    return get_logs_page(
+        db, limit=limit, cursor=cursor, user_id=user_id, action=action,
+        since=since, until=until, include_archive=include_archive
+    )
@@ -1,108 +1,125 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, and_, text
-from datetime import datetime, timedelta
+from sqlalchemy import func, desc, and_, text, case
+from datetime import date, datetime, timedelta
 from typing import List, Dict, Any, Optional
 from backend.models.database import get_db
 from backend.models.contact import ContactDB, TransactionDB
+from backend.models.rollup import TransactionDailyRollup
+from backend.services.analytics_cache import analytics_cache
+from backend.utils.auth import get_current_principal
 
-router = APIRouter()
+router = APIRouter(dependencies=[Depends(get_current_principal)])
 
-@router.get("/statistics/transactions")
-async def get_transaction_statistics(
-    db: Session = Depends(get_db),
-    period: str = Query("all", description="Time period: 'day', 'week', 'month', 'year', or 'all'")
-):
+# Look-back window for each statistics period; None means all time
+PERIODS = {
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+    "month": timedelta(days=30),
+    "year": timedelta(days=365),
+    "all": None
+}
+
+# Distribution of transaction amounts by range. Boundaries are inclusive on
+# both ends (as with BETWEEN), so a value on a boundary counts in both ranges.
+AMOUNT_RANGES = {
+    "negative_large": TransactionDB.amount < -500,
+    "negative_medium": TransactionDB.amount.between(-500, -100),
+    "negative_small": TransactionDB.amount.between(-100, 0),
+    "positive_small": TransactionDB.amount.between(0, 100),
+    "positive_medium": TransactionDB.amount.between(100, 500),
+    "positive_large": TransactionDB.amount > 500
+}
+
+TOP_CONTACTS_LIMIT = 10
+
+def period_start(period: str, now: Optional[datetime] = None) -> Optional[datetime]:
+    """Start of the window for a statistics period, or None for all time"""
+    delta = PERIODS.get(period)
+    if delta is None:
+        return None
+    return (now or datetime.now()) - delta
+
+def top_contacts(db: Session, since: Optional[datetime], limit: int = TOP_CONTACTS_LIMIT):
+    """Top contacts by transaction count and by total amount from one grouped pass.
+
+    Transactions are aggregated per contact_id, both rankings are taken with
+    window functions over that single aggregate, and only the winners are
+    joined to contacts for their names.
+
+    For a period only its date range is read, from the (date, contact_id,
+    amount) index, so the cost follows the period's size rather than the
+    table's; all time is read in contact order from (contact_id, date, amount).
     """
-    Get statistics about transactions.
-    This endpoint performs a complex statistical analysis on transaction data.
+    contact_id = TransactionDB.contact_id
+    if since is not None:
+        # contact_id + 0 keeps SQLite from grouping along the contact_id-led
+        # index, which would scan it whole; it seeks on date instead
+        contact_id = TransactionDB.contact_id + 0
+    per_contact = db.query(
+        contact_id.label("contact_id"),
+        func.count(TransactionDB.id).label("transaction_count"),
+        func.sum(TransactionDB.amount).label("total_amount")
+    )
+    if since is not None:
+        per_contact = per_contact.filter(TransactionDB.date >= since)
+    per_contact = per_contact.group_by(contact_id).subquery()
+
+    ranked = db.query(
+        per_contact,
+        func.row_number().over(
+            order_by=(per_contact.c.transaction_count.desc(), per_contact.c.contact_id)
+        ).label("volume_rank"),
+        func.row_number().over(
+            order_by=(per_contact.c.total_amount.desc(), per_contact.c.contact_id)
+        ).label("amount_rank")
+    ).subquery()
+
+    rows = db.query(
+        ContactDB.id,
+        ContactDB.name,
+        ranked.c.transaction_count,
+        ranked.c.total_amount,
+        ranked.c.volume_rank,
+        ranked.c.amount_rank
+    ).join(
+        ContactDB, ContactDB.id == ranked.c.contact_id
+    ).filter(
+        (ranked.c.volume_rank <= limit) | (ranked.c.amount_rank <= limit)
+    ).all()
+
+    by_volume = sorted((r for r in rows if r.volume_rank <= limit), key=lambda r: r.volume_rank)
+    by_amount = sorted((r for r in rows if r.amount_rank <= limit), key=lambda r: r.amount_rank)
+    return by_volume, by_amount
+
+def transaction_statistics(db: Session, period: str) -> Dict[str, Any]:
     """
-    # Define time filters based on period
-    now = datetime.now()
-    time_filter = None
-    
-    if period == "day":
-        time_filter = and_(TransactionDB.date >= now - timedelta(days=1))
-    elif period == "week":
-        time_filter = and_(TransactionDB.date >= now - timedelta(weeks=1))
-    elif period == "month":
-        time_filter = and_(TransactionDB.date >= now - timedelta(days=30))
-    elif period == "year":
-        time_filter = and_(TransactionDB.date >= now - timedelta(days=365))
+    Compute statistics about transactions.
+    Headline figures and the amount distribution come from a single scan over
+    the period's transactions; the top contacts from one grouped aggregation.
+    """
+    # One cutoff, computed once, is used by every part of the response
+    since = period_start(period)
     
-    # Base query
+    # Headline stats and every distribution bucket in one pass
     query = db.query(
         func.count(TransactionDB.id).label("total_count"),
         func.sum(TransactionDB.amount).label("total_amount"),
         func.avg(TransactionDB.amount).label("average_amount"),
         func.min(TransactionDB.amount).label("min_amount"),
-        func.max(TransactionDB.amount).label("max_amount")
+        func.max(TransactionDB.amount).label("max_amount"),
+        *[
+            func.coalesce(func.sum(case((condition, 1), else_=0)), 0).label(name)
+            for name, condition in AMOUNT_RANGES.items()
+        ]
     )
-    
-    # Apply time filter if specified
-    if time_filter:
-        query = query.filter(time_filter)
-    
-    # Execute the query
+    if since is not None:
+        query = query.filter(TransactionDB.date >= since)
     stats = query.one()
     
-    # Get additional statistics with separate optimized queries
-    
-    # Top 10 contacts by transaction volume
-    top_contacts_by_volume = db.query(
-        ContactDB.id,
-        ContactDB.name,
-        func.count(TransactionDB.id).label("transaction_count")
-    ).join(
-        TransactionDB, ContactDB.id == TransactionDB.contact_id
-    ).group_by(
-        ContactDB.id
-    ).order_by(
-        desc("transaction_count")
-    ).limit(10).all()
-    
-    # Top 10 contacts by transaction amount
-    top_contacts_by_amount = db.query(
-        ContactDB.id,
-        ContactDB.name,
-        func.sum(TransactionDB.amount).label("total_amount")
-    ).join(
-        TransactionDB, ContactDB.id == TransactionDB.contact_id
-    ).group_by(
-        ContactDB.id
-    ).order_by(
-        desc("total_amount")
-    ).limit(10).all()
-    
-    # Distribution of transaction amounts by range
-    ranges = {
-        "negative_large": "amount < -500",
-        "negative_medium": "amount BETWEEN -500 AND -100",
-        "negative_small": "amount BETWEEN -100 AND 0",
-        "positive_small": "amount BETWEEN 0 AND 100",
-        "positive_medium": "amount BETWEEN 100 AND 500",
-        "positive_large": "amount > 500"
-    }
+    amount_distribution = {name: getattr(stats, name) for name in AMOUNT_RANGES}
     
-    amount_distribution = {}
-    for name, condition in ranges.items():
-        sql = f"SELECT COUNT(*) FROM transactions WHERE {condition}"
-        if time_filter:
-            # Add date condition if needed
-            date_condition = ""
-            if period == "day":
-                date_condition = f" AND date >= datetime('now', '-1 day')"
-            elif period == "week":
-                date_condition = f" AND date >= datetime('now', '-7 day')"
-            elif period == "month":
-                date_condition = f" AND date >= datetime('now', '-30 day')"
-            elif period == "year":
-                date_condition = f" AND date >= datetime('now', '-365 day')"
-            
-            sql += date_condition
-            
-        result = db.execute(text(sql)).scalar()
-        amount_distribution[name] = result
+    top_contacts_by_volume, top_contacts_by_amount = top_contacts(db, since)
     
     # Return combined statistics
     return {
@@ -123,81 +140,148 @@ async def get_transaction_statistics(
         "period": period
     }
 
+@router.get("/statistics/transactions")
+def get_transaction_statistics(
+    db: Session = Depends(get_db),
+    period: str = Query("all", description="Time period: 'day', 'week', 'month', 'year', or 'all'")
+):
+    """
+    Get statistics about transactions.
+    Results are cached until the next contact or transaction write.
+    """
+    return analytics_cache.get_or_compute(
+        ("transactions", period),
+        lambda: transaction_statistics(db, period)
+    )
+
+# SQL expression giving the first day of the bucket a rollup day falls into
+# (weeks start on Monday)
+TREND_BUCKETS = {
+    "day": lambda day: func.date(day),
+    "week": lambda day: func.date(day, "-6 days", "weekday 1"),
+    "month": lambda day: func.strftime("%Y-%m-01", day)
+}
+
+def bucket_start(day: date, granularity: str) -> date:
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+def next_bucket(day: date, granularity: str) -> date:
+    if granularity == "week":
+        return day + timedelta(weeks=1)
+    if granularity == "month":
+        return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+    return day + timedelta(days=1)
+
+def cached_rollup_trends(db: Session, granularity: str, start: date, end: date) -> List[Dict[str, Any]]:
+    return analytics_cache.get_or_compute(
+        ("trends", granularity, start, end),
+        lambda: rollup_trends(db, granularity, start, end)
+    )
+
+def rollup_trends(db: Session, granularity: str, start: date, end: date) -> List[Dict[str, Any]]:
+    """
+    Transaction trends between two dates (inclusive) from the daily rollups,
+    in one grouped query. Buckets without transactions are filled with zeros.
+    """
+    bucket = TREND_BUCKETS[granularity](TransactionDailyRollup.day).label("bucket")
+    rows = db.query(
+        bucket,
+        func.sum(TransactionDailyRollup.transaction_count).label("count"),
+        func.sum(TransactionDailyRollup.total_amount).label("sum"),
+        func.sum(TransactionDailyRollup.positive_count).label("positive_count"),
+        func.sum(TransactionDailyRollup.negative_count).label("negative_count"),
+        func.min(TransactionDailyRollup.min_amount).label("min_amount"),
+        func.max(TransactionDailyRollup.max_amount).label("max_amount")
+    ).filter(
+        TransactionDailyRollup.day >= start,
+        TransactionDailyRollup.day <= end
+    ).group_by(bucket).all()
+    by_bucket = {date.fromisoformat(str(r.bucket)): r for r in rows}
+    
+    trends = []
+    current = bucket_start(start, granularity)
+    while current <= end:
+        r = by_bucket.get(current)
+        count = r.count if r else 0
+        total = float(r.sum) if r and r.sum else 0
+        trends.append({
+            "period_start": current,
+            "transaction_count": count,
+            "total_amount": total,
+            "average_amount": total / count if count else 0,
+            "positive_count": r.positive_count if r else 0,
+            "negative_count": r.negative_count if r else 0,
+            "min_amount": float(r.min_amount) if r and r.min_amount is not None else 0,
+            "max_amount": float(r.max_amount) if r and r.max_amount is not None else 0
+        })
+        current = next_bucket(current, granularity)
+    return trends
+
 @router.get("/statistics/transactions/monthly")
-async def get_monthly_transaction_trends(
+def get_monthly_transaction_trends(
     db: Session = Depends(get_db),
     months: int = Query(12, description="Number of months to analyze", ge=1, le=60)
 ):
     """
     Get monthly trends for transactions.
-    This endpoint analyzes transaction patterns over months.
+    Covers the last `months` calendar months, including the current one,
+    oldest first.
     """
-    # Generate a series of months
-    now = datetime.now()
-    month_data = []
+    today = date.today()
+    first_month = today.replace(day=1)
+    for _ in range(months - 1):
+        first_month = (first_month - timedelta(days=1)).replace(day=1)
     
-    for i in range(months):
-        month_start = (now - timedelta(days=30 * i)).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        next_month = month_start.month + 1 if month_start.month < 12 else 1
-        next_year = month_start.year + 1 if month_start.month == 12 else month_start.year
-        month_end = datetime(next_year, next_month, 1) - timedelta(microseconds=1)
-        
-        # For the current month, use current datetime as end
-        if i == 0:
-            month_end = now
-            
-        # Get transaction statistics for the month
-        stats = db.query(
-            func.count(TransactionDB.id).label("count"),
-            func.sum(TransactionDB.amount).label("sum"),
-            func.avg(TransactionDB.amount).label("avg")
-        ).filter(
-            TransactionDB.date >= month_start,
-            TransactionDB.date <= month_end
-        ).one()
-        
-        # Get positive and negative transaction counts
-        positive_count = db.query(
-            func.count(TransactionDB.id)
-        ).filter(
-            TransactionDB.date >= month_start,
-            TransactionDB.date <= month_end,
-            TransactionDB.amount > 0
-        ).scalar()
-        
-        negative_count = db.query(
-            func.count(TransactionDB.id)
-        ).filter(
-            TransactionDB.date >= month_start,
-            TransactionDB.date <= month_end,
-            TransactionDB.amount < 0
-        ).scalar()
-        
-        # Format month name
-        month_name = month_start.strftime("%B %Y")
-        
-        month_data.append({
-            "month": month_name,
-            "transaction_count": stats.count,
-            "total_amount": float(stats.sum) if stats.sum else 0,
-            "average_amount": float(stats.avg) if stats.avg else 0,
-            "positive_count": positive_count,
-            "negative_count": negative_count
-        })
+    month_data = [
+        {
+            "month": t["period_start"].strftime("%B %Y"),
+            "transaction_count": t["transaction_count"],
+            "total_amount": t["total_amount"],
+            "average_amount": t["average_amount"],
+            "positive_count": t["positive_count"],
+            "negative_count": t["negative_count"]
+        }
+        for t in cached_rollup_trends(db, "month", first_month, today)
+    ]
     
-    # Return the reversed list so most recent month is first
     return {
-        "monthly_trends": list(reversed(month_data)),
+        "monthly_trends": month_data,
         "total_months": months
     }
 
-@router.get("/statistics/contacts/tags")
-async def get_tag_statistics(
-    db: Session = Depends(get_db)
+@router.get("/statistics/transactions/trends")
+def get_transaction_trends(
+    db: Session = Depends(get_db),
+    granularity: str = Query("day", pattern="^(day|week|month)$", description="Bucket size: 'day', 'week' or 'month'"),
+    start: Optional[date] = Query(None, description="First day (inclusive), defaults to 30 days before end"),
+    end: Optional[date] = Query(None, description="Last day (inclusive), defaults to today")
 ):
     """
-    Get statistics about contact tags.
-    This endpoint analyzes the distribution and performance of different tags.
+    Get transaction trends over a custom date range.
+    Served from the daily rollup table.
+    """
+    end = end or date.today()
+    start = start or end - timedelta(days=30)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if (end - start).days > 3660:
+        raise HTTPException(status_code=400, detail="Date range is limited to 10 years")
+    
+    return {
+        "trends": cached_rollup_trends(db, granularity, start, end),
+        "granularity": granularity,
+        "start": start,
+        "end": end
+    }
+
+def tag_statistics(db: Session) -> Dict[str, Any]:
+    """
+    Compute statistics about contact tags.
+    Analyzes the distribution and performance of different tags.
     """
     # Count contacts by tag (take top 20)
     tag_counts = db.query(
@@ -249,4 +333,14 @@ async def get_tag_statistics(
             {"tag": t.tag, "transaction_count": t.transaction_count}
             for t in tag_transaction_counts if t.tag  # Filter out None tags
         ]
-    } 
\ No newline at end of file
+    }
+
+@router.get("/statistics/contacts/tags")
+def get_tag_statistics(
+    db: Session = Depends(get_db)
+):
+    """
+    Get statistics about contact tags.
+    Results are cached until the next contact or transaction write.
+    """
+    return analytics_cache.get_or_compute(("tags",), lambda: tag_statistics(db))
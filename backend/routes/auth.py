@@ -3,7 +3,7 @@ from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from backend.models.user import UserDB
 from backend.models.database import get_db
-from passlib.context import CryptContext
+from backend.services.passwords import password_hasher, PasswordHasherBusy
 import jwt
 from datetime import datetime, timedelta
 import os
@@ -14,8 +14,6 @@ SECRET_KEY = os.environ.get("JWT_SECRET", "supersecretkey")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
-pwd_context = CryptContext(schemes=["sha256_crypt"], deprecated="auto")
-
 class UserRegister(BaseModel):
     username: str
     password: str
@@ -24,6 +22,12 @@ class UserLogin(BaseModel):
     username: str
     password: str
 
+# Tell clients when to retry once the hashing pool is saturated
+BUSY_RETRY_AFTER = "1"
+
+def busy_error(e: PasswordHasherBusy) -> HTTPException:
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": BUSY_RETRY_AFTER})
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
@@ -35,7 +39,10 @@ def register(user: UserRegister, db: Session = Depends(get_db)):
     existing = db.query(UserDB).filter_by(username=user.username).first()
     if existing:
         raise HTTPException(status_code=400, detail="Username already exists")
-    hashed = pwd_context.hash(user.password)
+    try:
+        hashed = password_hasher.hash(user.password)
+    except PasswordHasherBusy as e:
+        raise busy_error(e)
     db_user = UserDB(username=user.username, password_hash=hashed)
     db.add(db_user)
     db.commit()
@@ -46,8 +53,18 @@ def register(user: UserRegister, db: Session = Depends(get_db)):
 @router.post("/login")
 def login(user: UserLogin, db: Session = Depends(get_db)):
     db_user = db.query(UserDB).filter_by(username=user.username).first()
-    if not db_user or not pwd_context.verify(user.password, db_user.password_hash):
+    if not db_user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    try:
+        valid, new_hash = password_hasher.verify_and_update(user.password, db_user.password_hash)
+    except PasswordHasherBusy as e:
+        raise busy_error(e)
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    # Hashing parameters changed since this password was stored
+    if new_hash:
+        db_user.password_hash = new_hash
+        db.commit()
     token = create_access_token({"sub": db_user.username, "user_id": db_user.id})
     return {
         "access_token": token,
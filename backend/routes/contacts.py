@@ -8,8 +8,7 @@ from datetime import datetime
 import random
 from backend.utils.logging import log_action
 from backend.routes.auth import login
-import jwt
-from fastapi import Header
+from backend.utils.auth import get_current_user_id
 
 router = APIRouter()
 
@@ -78,49 +77,55 @@ def populate_initial_contacts():
 # Initialize contacts
 populate_initial_contacts()
 
-# Helper to extract user_id from JWT
-SECRET_KEY = "supersecretkey"
-ALGORITHM = "HS256"
-def get_current_user_id(authorization: str = Header(...)):
-    try:
-        token = authorization.split()[1]
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload["user_id"]
-    except Exception:
-        raise HTTPException(status_code=401, detail="Invalid or missing token")
-
 @router.get("/contacts")
-async def get_contacts(
+def get_contacts(
     search: str = "",
     sort: str = "",
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous response's next_cursor"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. 'name,phone,balance'"),
+    include: Optional[str] = Query(None, description="Set to 'transactions' to embed each contact's transaction_history"),
+    count: str = Query("exact", pattern="^(exact|estimate|none)$", description="How to compute total: 'exact', 'estimate' or 'none'"),
     db: Session = Depends(get_db)
 ):
-    # Pass pagination parameters directly to the database store
-    contacts = db_store.get_all_contacts(db, search, sort, page, limit)
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    includes = {i.strip() for i in include.split(",") if i.strip()} if include else set()
+    if includes - {"transactions"}:
+        raise HTTPException(status_code=400, detail="Only 'transactions' can be included")
     
-    # Get total count for pagination info
-    total_count = db_store.get_contacts_count(db, search)
+    # A cursor seeks straight to the next page; page is only used without one
+    try:
+        result = db_store.get_contacts_page(
+            db, search, sort, limit, cursor=cursor, page=page,
+            fields=field_list, include_transactions="transactions" in includes
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Get total count for pagination info (cached, estimated or skipped)
+    total_count = db_store.get_contacts_count(db, search, mode=count)
     
     # Return both the contacts and metadata
     return {
-        "items": contacts,
+        "items": result["items"],
         "total": total_count,
         "page": page,
         "limit": limit,
-        "pages": (total_count + limit - 1) // limit  # Calculate total pages
+        "pages": (total_count + limit - 1) // limit if total_count is not None else None,  # Calculate total pages
+        "count": count,
+        "next_cursor": result["next_cursor"]
     }
 
 @router.get("/contacts/{contact_id}")
-async def get_contact(contact_id: int, db: Session = Depends(get_db)):
+def get_contact(contact_id: int, db: Session = Depends(get_db)):
     contact = db_store.get_contact(db, contact_id)
     if not contact:
         raise HTTPException(status_code=404, detail="Contact not found")
     return contact
 
 @router.post("/contacts")
-async def create_contact(contact: ContactCreate, db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+def create_contact(contact: ContactCreate, db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
     # Generate tag if not provided
     if not contact.tag and contact.name and contact.phone:
         first_two = contact.name[:2] if len(contact.name) >= 2 else contact.name
@@ -133,30 +138,17 @@ async def create_contact(contact: ContactCreate, db: Session = Depends(get_db),
     return new_contact
 
 @router.put("/contacts/{contact_id}")
-async def update_contact(contact_id: int, contact_update: ContactUpdate, db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
-    updated_contact = db_store.update_contact(db, contact_id, contact_update)
+def update_contact(contact_id: int, contact_update: ContactUpdate, db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    # The tag is recomputed if name or phone changed, in the same write
+    updated_contact = db_store.update_contact(db, contact_id, contact_update, retag=True)
     if not updated_contact:
         raise HTTPException(status_code=404, detail="Contact not found")
     
-    # Update tag if name or phone changed
-    if (contact_update.name or contact_update.phone) and updated_contact:
-        name = updated_contact["name"]
-        phone = updated_contact["phone"]
-        
-        first_two = name[:2] if len(name) >= 2 else name
-        last_two_digits = phone[-2:] if len(phone) >= 2 else phone
-        last_two_name = name[-2:] if len(name) >= 2 else name
-        new_tag = f"{first_two}{last_two_digits}{last_two_name}"
-        
-        # Update the tag
-        contact_update.tag = new_tag
-        updated_contact = db_store.update_contact(db, contact_id, contact_update)
-    
     log_action(db, user_id, "update_contact", details=f"Contact ID: {contact_id}")
     return updated_contact
 
 @router.delete("/contacts/{contact_id}")
-async def delete_contact(contact_id: int, db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+def delete_contact(contact_id: int, db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
     success = db_store.delete_contact(db, contact_id)
     if not success:
         raise HTTPException(status_code=404, detail="Contact not found")
@@ -164,7 +156,7 @@ async def delete_contact(contact_id: int, db: Session = Depends(get_db), user_id
     return {"message": "Contact deleted"}
 
 @router.post("/contacts/{contact_id}/transaction")
-async def add_transaction(
+def add_transaction(
     contact_id: int = Path(..., description="Contact ID"),
     transaction: TransactionCreate = None,
     db: Session = Depends(get_db),
@@ -177,7 +169,7 @@ async def add_transaction(
     return updated_contact
 
 @router.get("/contacts/{contact_id}/transactions")
-async def get_transactions(
+def get_transactions(
     contact_id: int = Path(..., description="Contact ID"),
     db: Session = Depends(get_db)
 ):
@@ -190,7 +182,7 @@ async def get_transactions(
     return transactions
 
 @router.get("/transactions/{transaction_id}")
-async def get_transaction(
+def get_transaction(
     transaction_id: int = Path(..., description="Transaction ID"),
     db: Session = Depends(get_db)
 ):
@@ -202,7 +194,7 @@ async def get_transaction(
     return transaction
 
 @router.delete("/transactions/{transaction_id}")
-async def delete_transaction(
+def delete_transaction(
     transaction_id: int = Path(..., description="Transaction ID"),
     db: Session = Depends(get_db),
     user_id: int = Depends(get_current_user_id)
@@ -0,0 +1,222 @@
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from starlette.responses import JSONResponse
+
+from backend.utils.auth import principal_cache
+
+# Route classes and the paths they cover; anything else (WebSocket, static
+# uploads, docs, /api/metrics) is never limited
+ROUTE_CLASSES = (
+    ("analytics", ("/api/statistics",)),
+    ("bulk", ("/api/export-contacts", "/api/import-contacts", "/api/upload")),
+    ("crud", ("/api/contacts", "/api/auth", "/api/admin", "/api/jobs")),
+)
+
+# Per class: requests running at once, requests allowed to wait for a slot
+# and how long they wait (seconds), then the per-client token bucket
+# (requests per second and burst size; a rate of 0 disables it).
+# Each value can be overridden, e.g. ADMISSION_ANALYTICS_CONCURRENCY=8.
+DEFAULT_LIMITS = {
+    "analytics": {"concurrency": 4, "queue": 16, "queue_timeout": 2, "rate": 2, "burst": 10},
+    "bulk": {"concurrency": 2, "queue": 4, "queue_timeout": 5, "rate": 0.2, "burst": 3},
+    "crud": {"concurrency": 32, "queue": 128, "queue_timeout": 1, "rate": 20, "burst": 40},
+}
+
+# Clients (users or IPs) whose token buckets are kept in memory
+RATE_LIMIT_CLIENTS = int(os.environ.get("RATE_LIMIT_CLIENTS", "100000"))
+
+
+def load_limits() -> Dict[str, Dict[str, float]]:
+    return {
+        route_class: {
+            name: float(os.environ.get(f"ADMISSION_{route_class.upper()}_{name.upper()}", default))
+            for name, default in defaults.items()
+        }
+        for route_class, defaults in DEFAULT_LIMITS.items()
+    }
+
+
+def classify(path: str) -> Optional[str]:
+    for route_class, prefixes in ROUTE_CLASSES:
+        if path.startswith(prefixes):
+            return route_class
+    return None
+
+
+class ConcurrencyLimit:
+    """A fair semaphore with a bounded wait queue, used on the event loop only"""
+
+    def __init__(self, limit: int, max_queue: int, queue_timeout: float):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.rejected = 0
+
+    async def acquire(self) -> bool:
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return True
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+            return True
+        except asyncio.TimeoutError:
+            if waiter.done():
+                # The slot was handed over just as the wait ran out
+                return True
+            self._waiters.remove(waiter)
+            waiter.cancel()
+            self.rejected += 1
+            return False
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self):
+        # Hand the slot straight to the next waiter, so active stays the same
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+
+class RateLimiter:
+    """Token buckets per (client, route class), kept in a bounded LRU"""
+
+    def __init__(self, max_clients: int = RATE_LIMIT_CLIENTS):
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[Tuple[str, str], Tuple[float, float]]" = OrderedDict()
+        self.rejected = 0
+
+    def take(self, client: str, route_class: str, rate: float, burst: float) -> float:
+        """Spend one token; returns 0 if allowed, else seconds until a token is available"""
+        now = time.monotonic()
+        key = (client, route_class)
+        tokens, last = self._buckets.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - last) * rate)
+        if tokens >= 1:
+            wait = 0.0
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+            self.rejected += 1
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class AdmissionController:
+    def __init__(self, limits: Optional[Dict[str, Dict[str, float]]] = None):
+        self.limits = limits or load_limits()
+        self.concurrency = {
+            route_class: ConcurrencyLimit(int(cfg["concurrency"]), int(cfg["queue"]), cfg["queue_timeout"])
+            for route_class, cfg in self.limits.items()
+        }
+        self.rate_limiter = RateLimiter()
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {
+            route_class: {
+                "active": limit.active,
+                "queued": limit.queued,
+                "concurrency": limit.limit,
+                "max_queue": limit.max_queue,
+                "rejected_busy": limit.rejected
+            }
+            for route_class, limit in self.concurrency.items()
+        }
+        stats["rejected_rate_limited"] = self.rate_limiter.rejected
+        return stats
+
+
+# Create a global instance of the controller
+admission = AdmissionController()
+
+
+def client_key(scope) -> str:
+    """
+    The authenticated user when the token is already verified, otherwise the client IP.
+
+    Behind nginx the connection always comes from the proxy, so the IP is only
+    the client's when uvicorn runs with --proxy-headers and FORWARDED_ALLOW_IPS
+    set to the proxy: it then puts the X-Forwarded-For address (which nginx
+    sets to the real peer) into scope["client"]. See backend/Dockerfile.
+    """
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            parts = value.decode("latin-1").split()
+            if len(parts) == 2:
+                principal = principal_cache.get(parts[1])
+                if principal is not None:
+                    return f"user:{principal.user_id}"
+            break
+    client = scope.get("client")
+    return f"ip:{client[0]}" if client else "ip:unknown"
+
+
+class AdmissionMiddleware:
+    """
+    Rate limits and admission control per route class.
+
+    A request first spends a token from its client's bucket for the route
+    class (429 when empty), then waits for one of the class's concurrency
+    slots. If the wait queue is full, or no slot frees up within the queue
+    timeout, it is shed with 503. Both carry Retry-After.
+    """
+
+    def __init__(self, app, controller: AdmissionController = admission):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        route_class = classify(scope["path"]) if scope["type"] == "http" else None
+        if route_class is None or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        cfg = self.controller.limits[route_class]
+        if cfg["rate"] > 0:
+            wait = self.controller.rate_limiter.take(client_key(scope), route_class, cfg["rate"], cfg["burst"])
+            if wait:
+                await self._reject(scope, receive, send, 429, "Too many requests", wait)
+                return
+
+        limit = self.controller.concurrency[route_class]
+        if not await limit.acquire():
+            await self._reject(scope, receive, send, 503, "Server busy, try again shortly", limit.queue_timeout)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limit.release()
+
+    async def _reject(self, scope, receive, send, status_code: int, detail: str, retry_after: float):
+        response = JSONResponse(
+            {"detail": detail},
+            status_code=status_code,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
+        await response(scope, receive, send)
@@ -0,0 +1,106 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+# How long a computed analytics response may be served, and how many
+# distinct responses (endpoint + parameters) are kept
+ANALYTICS_CACHE_TTL = float(os.environ.get("ANALYTICS_CACHE_TTL", "60"))
+ANALYTICS_CACHE_SIZE = int(os.environ.get("ANALYTICS_CACHE_SIZE", "256"))
+
+
+class _Flight:
+    """A computation in progress that other requests for the same key wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+
+
+class AnalyticsCache:
+    """
+    LRU + TTL cache for analytics responses.
+
+    Entries are keyed by (data version, endpoint key). Every write to contacts
+    or transactions bumps the version, so older entries simply stop matching
+    and age out of the LRU. Concurrent requests for the same missing key are
+    coalesced: one thread computes, the others wait for its result.
+    """
+
+    def __init__(self, ttl: float = ANALYTICS_CACHE_TTL, max_size: int = ANALYTICS_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.version = 0
+        self._entries: "OrderedDict[Tuple[int, Hashable], Tuple[Any, float]]" = OrderedDict()
+        self._inflight: Dict[Tuple[int, Hashable], _Flight] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def invalidate(self):
+        """Mark all cached results as stale, called by the write paths"""
+        with self._lock:
+            self.version += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Return the cached result for `key`, computing it at most once at a time"""
+        with self._lock:
+            full_key = (self.version, key)
+            entry = self._entries.get(full_key)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(full_key)
+                self.hits += 1
+                return entry[0]
+
+            flight = self._inflight.get(full_key)
+            leader = flight is None
+            if leader:
+                self.misses += 1
+                flight = self._inflight[full_key] = _Flight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = compute()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[full_key]
+                if flight.error is None:
+                    self._entries[full_key] = (flight.result, time.monotonic() + self.ttl)
+                    self._entries.move_to_end(full_key)
+                    while len(self._entries) > self.max_size:
+                        self._entries.popitem(last=False)
+            flight.done.set()
+
+        return flight.result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "version": self.version,
+                "entries": len(self._entries),
+                "in_flight": len(self._inflight),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced
+            }
+
+
+# Create a global instance of the cache
+analytics_cache = AnalyticsCache()
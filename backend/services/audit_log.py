@@ -0,0 +1,130 @@
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from backend.models.database import engine
+from backend.models.log import LogEntry
+
+# Records written per group commit, and the longest a record waits for one
+AUDIT_LOG_BATCH_SIZE = int(os.environ.get("AUDIT_LOG_BATCH_SIZE", "500"))
+AUDIT_LOG_FLUSH_MS = float(os.environ.get("AUDIT_LOG_FLUSH_MS", "200"))
+
+# Records waiting to be written; when the writer falls this far behind, new
+# records are dropped (and counted) rather than blocking requests
+AUDIT_LOG_QUEUE_SIZE = int(os.environ.get("AUDIT_LOG_QUEUE_SIZE", "100000"))
+
+_STOP = object()
+
+
+class AuditLogWriter:
+    """
+    Writes audit log records in the background.
+
+    Request handlers only enqueue a record. A writer thread collects records
+    into batches of up to AUDIT_LOG_BATCH_SIZE, or whatever arrived within
+    AUDIT_LOG_FLUSH_MS, and inserts each batch in a single transaction, so
+    many requests share one commit instead of paying for their own.
+    """
+
+    def __init__(self, batch_size: int = AUDIT_LOG_BATCH_SIZE, flush_ms: float = AUDIT_LOG_FLUSH_MS,
+                 max_queue: int = AUDIT_LOG_QUEUE_SIZE):
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self.max_queue_depth = 0
+
+    def record(self, user_id: int, action: str, details: Optional[str] = None):
+        """Queue a log record; never blocks the caller"""
+        self.start()
+        try:
+            self._queue.put_nowait({
+                "user_id": user_id, "action": action, "details": details, "timestamp": datetime.now()
+            })
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return
+        depth = self._queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+
+    def start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        """Write everything still queued, then stop the writer; blocks for up to `timeout` seconds"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        deadline = time.monotonic() + timeout
+        try:
+            # The queue may be full; the writer makes room as it drains it
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            print(f"Audit log: writer did not catch up, {self._queue.qsize()} records not written")
+            return
+        thread.join(max(0.0, deadline - time.monotonic()))
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch: List[Dict[str, Any]] = []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        try:
+            with engine.begin() as conn:
+                conn.execute(LogEntry.__table__.insert(), batch)
+        except Exception as e:
+            with self._lock:
+                self.failed += len(batch)
+            print(f"Audit log: failed to write {len(batch)} records: {e}")
+            return
+        with self._lock:
+            self.written += len(batch)
+            self.batches += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self.max_queue_depth,
+                "written": self.written,
+                "batches": self.batches,
+                "dropped": self.dropped,
+                "failed": self.failed
+            }
+
+
+# Create a global instance of the writer
+audit_log = AuditLogWriter()
@@ -0,0 +1,237 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+from fastapi.encoders import jsonable_encoder
+
+# Topics clients can subscribe to over /ws:
+#   contacts        every contact change (created, updated, deleted, imported)
+#   contact:{id}    changes to one contact and its transactions
+#   analytics       a nudge that statistics have changed and should be refetched
+#   jobs, job:{id}  background job progress
+CONTACTS_TOPIC = "contacts"
+ANALYTICS_TOPIC = "analytics"
+JOBS_TOPIC = "jobs"
+
+TOPIC_PATTERN = re.compile(r"^(contacts|analytics|jobs|contact:\d+|job:[0-9a-f]{1,32})$")
+
+
+# Internal topic (not open to clients): tells every worker to drop cached
+# state after a committed write, i.e. analytics results, contact counts and
+# verified principals. Published before the matching client events, so a
+# client refetching on `analytics_changed` never hits a stale worker.
+INVALIDATION_TOPIC = "invalidate"
+
+
+def contact_topic(contact_id: int) -> str:
+    return f"contact:{contact_id}"
+
+
+def job_topic(job_id: str) -> str:
+    return f"job:{job_id}"
+
+
+def is_valid_topic(topic: Any) -> bool:
+    return isinstance(topic, str) and bool(TOPIC_PATTERN.match(topic))
+
+
+# Where events travel between publishers and subscribers:
+#   memory  within this process only (a single uvicorn worker)
+#   sqlite  across every worker process on this machine, through a shared
+#           notification table polled by each worker
+EVENT_BUS_BACKEND = os.environ.get("EVENT_BUS_BACKEND", "memory")
+EVENT_BUS_DB = os.environ.get("EVENT_BUS_DB", "./events.db")
+
+# Seconds between polls of the notification table, i.e. the worst-case extra
+# latency for events coming from another worker
+EVENT_BUS_POLL_INTERVAL = float(os.environ.get("EVENT_BUS_POLL_INTERVAL", "0.1"))
+
+# Seconds a notification is kept; every worker has long since read it by then
+EVENT_BUS_RETENTION = float(os.environ.get("EVENT_BUS_RETENTION", "60"))
+
+Subscriber = Callable[[List[str], str], None]
+
+
+class InProcessBackend:
+    """Delivers events straight to the subscribers of this process"""
+
+    def __init__(self):
+        self._deliver: Subscriber = lambda topics, message: None
+
+    def start(self, deliver: Subscriber):
+        self._deliver = deliver
+
+    def publish(self, topics: List[str], message: str):
+        self._deliver(topics, message)
+
+    def stop(self):
+        pass
+
+
+class SQLiteBackend:
+    """
+    Shares events between worker processes through a table in a small SQLite
+    file that every worker can open.
+
+    Publishing delivers to local subscribers immediately and appends a row
+    tagged with this worker's id. A polling thread in each worker picks up the
+    rows other workers appended since its last poll, so remote events arrive
+    within EVENT_BUS_POLL_INTERVAL. Old rows are deleted after
+    EVENT_BUS_RETENTION seconds.
+    """
+
+    def __init__(self, path: str = EVENT_BUS_DB, poll_interval: float = EVENT_BUS_POLL_INTERVAL,
+                 retention: float = EVENT_BUS_RETENTION):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.origin = uuid.uuid4().hex
+        self._deliver: Subscriber = lambda topics, message: None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_id = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA busy_timeout = 5000")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS event_notifications (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                origin TEXT NOT NULL,
+                topics TEXT NOT NULL,
+                message TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        return conn
+
+    def start(self, deliver: Subscriber):
+        self._deliver = deliver
+        self._conn = self._connect()
+        # Only events published from now on are of interest
+        self._last_id = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM event_notifications").fetchone()[0]
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._poll_loop, name="event-bus-poll", daemon=True)
+        self._thread.start()
+
+    def publish(self, topics: List[str], message: str):
+        self._deliver(topics, message)
+        with self._lock:
+            if self._conn is None:
+                return
+            self._conn.execute(
+                "INSERT INTO event_notifications (origin, topics, message, created_at) VALUES (?, ?, ?, ?)",
+                (self.origin, json.dumps(topics), message, time.time())
+            )
+
+    def _poll_loop(self):
+        # The poller reads through its own connection so it never waits on publishers
+        conn = self._connect()
+        last_prune = 0.0
+        try:
+            while not self._stop.wait(self.poll_interval):
+                try:
+                    rows = conn.execute(
+                        "SELECT id, origin, topics, message FROM event_notifications WHERE id > ? ORDER BY id",
+                        (self._last_id,)
+                    ).fetchall()
+                    for event_id, origin, topics, message in rows:
+                        self._last_id = event_id
+                        if origin != self.origin:
+                            self._deliver(json.loads(topics), message)
+
+                    now = time.time()
+                    if now - last_prune > self.retention:
+                        conn.execute("DELETE FROM event_notifications WHERE created_at < ?", (now - self.retention,))
+                        last_prune = now
+                except sqlite3.Error as e:
+                    print(f"Event bus poll failed: {e}")
+        finally:
+            conn.close()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        with self._lock:
+            if self._conn:
+                self._conn.close()
+                self._conn = None
+
+
+BACKENDS = {
+    "memory": InProcessBackend,
+    "sqlite": SQLiteBackend,
+}
+
+
+def create_backend(name: str = EVENT_BUS_BACKEND):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown event bus backend '{name}', expected one of: {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
+
+
+class EventBus:
+    """
+    Carries change events from the write paths to whoever delivers them.
+
+    Events are published from request and job threads after the change is
+    committed. The message is serialized once here and handed to the backend,
+    which brings it to the subscribers (the WebSocket manager) of this and,
+    depending on the backend, every other worker process.
+    """
+
+    def __init__(self, backend=None):
+        self._subscribers: List[Subscriber] = []
+        self.backend = backend or InProcessBackend()
+        self._started = False
+
+    def subscribe(self, callback: Subscriber) -> Callable[[], None]:
+        self._subscribers.append(callback)
+        return lambda: self._subscribers.remove(callback)
+
+    def start(self, backend=None):
+        """Connect to the backend, called once per worker on startup"""
+        if backend is not None:
+            self.backend = backend
+        self.backend.start(self._dispatch)
+        self._started = True
+
+    def stop(self):
+        if self._started:
+            self.backend.stop()
+            self._started = False
+
+    def publish(self, topics: Iterable[str], message: Union[str, Dict[str, Any]]):
+        # Before start() (scripts, CLI tools) there is nobody to tell
+        if not self._started:
+            return
+        topics = list(topics)
+        if not isinstance(message, str):
+            # Same encoding as the HTTP responses (ISO dates etc.)
+            message = json.dumps(jsonable_encoder(message))
+        try:
+            self.backend.publish(topics, message)
+        except Exception as e:
+            print(f"Failed to publish event to {topics}: {e}")
+
+    def _dispatch(self, topics: List[str], message: str):
+        for callback in list(self._subscribers):
+            try:
+                callback(topics, message)
+            except Exception as e:
+                print(f"Failed to deliver event to {topics}: {e}")
+
+
+# Create a global instance of the event bus
+event_bus = EventBus()
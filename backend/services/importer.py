@@ -0,0 +1,105 @@
+import csv
+import os
+import time
+from typing import IO, Any, Callable, Dict, List, Optional
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+from backend.models.contact import ContactCreate
+from backend.store.db_store import db_store
+from backend.services.events import event_bus, CONTACTS_TOPIC
+
+# Rows validated and written per set-based insert, and per commit
+IMPORT_BATCH_SIZE = int(os.environ.get("IMPORT_BATCH_SIZE", "5000"))
+
+# Only the first errors are reported in full; the rest are just counted
+MAX_REPORTED_ERRORS = 100
+
+REQUIRED_COLUMNS = ['name', 'phone', 'email']
+
+UPSERT_KEYS = ("phone", "email")
+
+
+def _parse_row(row: Dict[str, str]) -> ContactCreate:
+    amount = (row.get('last_transaction') or '').strip()
+    return ContactCreate(
+        name=row['name'],
+        phone=row['phone'],
+        email=row['email'],
+        notes=row.get('notes', ''),
+        tag=row.get('tag', ''),
+        last_transaction=float(amount) if amount else 0
+    )
+
+
+def _error_message(e: Exception) -> str:
+    if isinstance(e, ValidationError):
+        return "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+    return str(e)
+
+
+def import_contacts_csv(db: Session, stream: IO[str], upsert_on: Optional[str] = None,
+                        batch_size: int = IMPORT_BATCH_SIZE,
+                        on_progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """
+    Import contacts from a CSV text stream.
+
+    The file is parsed row by row and written in batches of `batch_size`
+    through DBStore.bulk_upsert_contacts, one commit per batch. Rows that fail
+    validation are reported with their line number and skipped without
+    aborting the import. `on_progress` is called with the running totals
+    after every batch.
+    """
+    if upsert_on is not None and upsert_on not in UPSERT_KEYS:
+        raise ValueError(f"upsert_on must be one of {', '.join(UPSERT_KEYS)}")
+
+    reader = csv.DictReader(stream)
+    missing = [c for c in REQUIRED_COLUMNS if c not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(missing)}")
+
+    start = time.monotonic()
+    progress = {"rows": 0, "inserted": 0, "updated": 0, "error_count": 0, "errors": []}
+    batch: List[ContactCreate] = []
+
+    def write_batch():
+        result = db_store.bulk_upsert_contacts(db, batch, upsert_on=upsert_on)
+        db.commit()
+        progress["inserted"] += result["inserted"]
+        progress["updated"] += result["updated"]
+        batch.clear()
+        if on_progress:
+            elapsed = time.monotonic() - start
+            on_progress({**progress, "rows_per_second": progress["rows"] / elapsed if elapsed else 0})
+
+    try:
+        for row in reader:
+            progress["rows"] += 1
+            try:
+                batch.append(_parse_row(row))
+            except (ValidationError, ValueError, TypeError) as e:
+                progress["error_count"] += 1
+                if len(progress["errors"]) < MAX_REPORTED_ERRORS:
+                    progress["errors"].append({"line": reader.line_num, "error": _error_message(e)})
+            if len(batch) >= batch_size:
+                write_batch()
+        if batch or on_progress:
+            write_batch()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        # Even a partial import changes what lists and dashboards show
+        db_store.invalidate_caches()
+        # One summary event per import rather than one per row
+        if progress["inserted"] or progress["updated"]:
+            event_bus.publish([CONTACTS_TOPIC], {
+                "type": "contacts_imported",
+                "data": {"inserted": progress["inserted"], "updated": progress["updated"]}
+            })
+            db_store.publish_analytics_changed()
+
+    elapsed = time.monotonic() - start
+    progress["seconds"] = round(elapsed, 3)
+    progress["rows_per_second"] = progress["rows"] / elapsed if elapsed else 0
+    return progress
@@ -0,0 +1,167 @@
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from backend.models.database import SessionLocal
+from backend.services.events import event_bus, JOBS_TOPIC, job_topic
+from backend.services.importer import import_contacts_csv
+
+# Imports run one at a time by default; they all write to the same SQLite file
+IMPORT_WORKERS = int(os.environ.get("IMPORT_WORKERS", "1"))
+
+# Finished jobs kept around for /api/jobs/{id}, and jobs of other workers
+# (learned from their progress events) kept for the same
+MAX_FINISHED_JOBS = 100
+
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+
+
+class ImportJob:
+    def __init__(self, path: str, filename: str, upsert_on: Optional[str]):
+        self.id = uuid.uuid4().hex
+        self.path = path
+        self.filename = filename
+        self.upsert_on = upsert_on
+        self.status = "queued"
+        self.created_at = datetime.now()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.progress: Dict[str, Any] = {
+            "rows": 0, "inserted": 0, "updated": 0, "error_count": 0, "errors": [], "rows_per_second": 0
+        }
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "type": "import_contacts",
+            "filename": self.filename,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "rows_processed": self.progress["rows"],
+            "inserted": self.progress["inserted"],
+            "updated": self.progress["updated"],
+            "error_count": self.progress["error_count"],
+            "errors": self.progress["errors"],
+            "rows_per_second": round(self.progress.get("rows_per_second", 0), 1),
+            "error": self.error
+        }
+
+
+class JobManager:
+    """
+    Runs CSV imports in background worker threads.
+
+    Every state change is published on the `jobs` and `job:{id}` topics so
+    clients can follow progress over the WebSocket without polling. The
+    events also reach the other workers through the event bus, and each
+    keeps the latest state of their jobs, so /api/jobs/{id} answers no matter
+    which worker serves it. (A worker only knows jobs that reported progress
+    after it started.)
+    """
+
+    def __init__(self, workers: int = IMPORT_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="import-job")
+        self._jobs: "OrderedDict[str, ImportJob]" = OrderedDict()
+        self._remote_jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit_import(self, path: str, filename: str, upsert_on: Optional[str] = None) -> ImportJob:
+        """Queue an import of the CSV at `path`; the file is deleted when the job ends"""
+        job = ImportJob(path, filename, upsert_on)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._publish(job)
+        future = self._executor.submit(self._run_import, job)
+        future.add_done_callback(lambda f: self._cancelled(job, f))
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return job.to_dict()
+            return self._remote_jobs.get(job_id)
+
+    def _prune(self):
+        finished = [j.id for j in self._jobs.values() if j.status in FINISHED_STATUSES]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+    def record_remote(self, data: Dict[str, Any]):
+        """Keep the latest state of a job run by another worker"""
+        with self._lock:
+            if data["id"] in self._jobs:
+                return
+            self._remote_jobs[data["id"]] = data
+            self._remote_jobs.move_to_end(data["id"])
+            while len(self._remote_jobs) > MAX_FINISHED_JOBS:
+                self._remote_jobs.popitem(last=False)
+
+    def _publish(self, job: ImportJob):
+        event_bus.publish([JOBS_TOPIC, job_topic(job.id)], {"type": "job_progress", "data": job.to_dict()})
+
+    def _run_import(self, job: ImportJob):
+        job.status = "running"
+        job.started_at = datetime.now()
+        self._publish(job)
+
+        def on_progress(progress: Dict[str, Any]):
+            job.progress = progress
+            self._publish(job)
+
+        db = SessionLocal()
+        try:
+            with open(job.path, encoding="utf-8-sig", newline="") as stream:
+                job.progress = import_contacts_csv(db, stream, upsert_on=job.upsert_on, on_progress=on_progress)
+            job.status = "completed"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            db.close()
+            job.finished_at = datetime.now()
+            try:
+                os.remove(job.path)
+            except OSError:
+                pass
+            self._publish(job)
+
+    def _cancelled(self, job: ImportJob, future: Future):
+        # Queued jobs cancelled by shutdown() never run, so their copy of the
+        # upload would be left behind
+        if not future.cancelled():
+            return
+        job.status = "cancelled"
+        job.finished_at = datetime.now()
+        try:
+            os.remove(job.path)
+        except OSError:
+            pass
+        self._publish(job)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Create a global instance of the job manager
+job_manager = JobManager()
+
+
+def _on_job_event(topics, message):
+    if JOBS_TOPIC not in topics:
+        return
+    event = json.loads(message)
+    if event.get("type") == "job_progress":
+        job_manager.record_remote(event["data"])
+
+
+event_bus.subscribe(_on_job_event)
@@ -0,0 +1,136 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.orm import Session
+
+from backend.models.database import engine, apply_sqlite_pragmas
+from backend.models.log import LogEntry
+
+# Log entries older than this many days are moved to the archive database
+LOG_RETENTION_DAYS = float(os.environ.get("LOG_RETENTION_DAYS", "90"))
+LOG_ARCHIVE_DB = os.environ.get("LOG_ARCHIVE_DB", "./ubbank_archive.db")
+
+# Entries moved per transaction, so archiving never holds the write lock long
+LOG_ARCHIVE_BATCH_SIZE = int(os.environ.get("LOG_ARCHIVE_BATCH_SIZE", "5000"))
+
+# Hours between archive runs in the server
+LOG_ARCHIVE_INTERVAL_HOURS = float(os.environ.get("LOG_ARCHIVE_INTERVAL_HOURS", "24"))
+
+logs_table = LogEntry.__table__
+
+archive_engine = create_engine(f"sqlite:///{LOG_ARCHIVE_DB}", connect_args={"check_same_thread": False})
+event.listen(archive_engine, "connect", apply_sqlite_pragmas)
+
+_archive_ready = False
+
+
+def ensure_archive():
+    """Create the archive's logs table (same schema and indexes as the hot one)"""
+    global _archive_ready
+    if not _archive_ready:
+        logs_table.create(bind=archive_engine, checkfirst=True)
+        for index in logs_table.indexes:
+            index.create(bind=archive_engine, checkfirst=True)
+        _archive_ready = True
+
+
+def archive_logs(retention_days: float = LOG_RETENTION_DAYS, batch_size: int = LOG_ARCHIVE_BATCH_SIZE) -> int:
+    """
+    Move log entries older than the retention period to the archive database.
+
+    Each batch is first copied into the archive (ids are kept, and a batch
+    that was already copied is skipped), then deleted from the hot table, so
+    an interrupted run loses nothing and can simply be repeated.
+    Returns the number of entries moved.
+    """
+    ensure_archive()
+    cutoff = datetime.now() - timedelta(days=retention_days)
+    moved = 0
+    with engine.connect() as hot:
+        # The newest entry always stays, so SQLite never hands out an id
+        # that already exists in the archive
+        newest_id = hot.execute(select(func.max(logs_table.c.id))).scalar()
+        if newest_id is None:
+            return 0
+        while True:
+            rows = hot.execute(
+                select(logs_table)
+                .where(logs_table.c.timestamp < cutoff, logs_table.c.id < newest_id)
+                .order_by(logs_table.c.id)
+                .limit(batch_size)
+            ).mappings().all()
+            if not rows:
+                break
+            with archive_engine.begin() as archive:
+                archive.execute(logs_table.insert().prefix_with("OR IGNORE"), [dict(row) for row in rows])
+            ids = [row["id"] for row in rows]
+            hot.execute(logs_table.delete().where(logs_table.c.id.in_(ids)))
+            hot.commit()
+            moved += len(rows)
+    return moved
+
+
+def _log_filters(user_id: Optional[int], action: Optional[str], since: Optional[datetime],
+                 until: Optional[datetime], before_id: Optional[int]):
+    filters = []
+    if user_id is not None:
+        filters.append(logs_table.c.user_id == user_id)
+    if action:
+        filters.append(logs_table.c.action == action)
+    if since is not None:
+        filters.append(logs_table.c.timestamp >= since)
+    if until is not None:
+        filters.append(logs_table.c.timestamp < until)
+    if before_id is not None:
+        filters.append(logs_table.c.id < before_id)
+    return filters
+
+
+def get_logs_page(db: Session, limit: int = 50, cursor: Optional[int] = None, user_id: Optional[int] = None,
+                  action: Optional[str] = None, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                  include_archive: bool = True) -> Dict[str, Any]:
+    """
+    One page of log entries, newest first, across the hot table and the archive.
+
+    Pages are keyed by id: `cursor` is the next_cursor of the previous page and
+    each source is asked for the entries below it, so every page is an index
+    seek no matter how deep. Both sources are read and merged by id.
+    """
+    filters = _log_filters(user_id, action, since, until, cursor)
+    query = select(logs_table).where(*filters).order_by(logs_table.c.id.desc()).limit(limit + 1)
+
+    items: List[Dict[str, Any]] = [
+        {**row, "archived": False} for row in db.execute(query).mappings()
+    ]
+    if include_archive:
+        ensure_archive()
+        with archive_engine.connect() as archive:
+            archived = [{**row, "archived": True} for row in archive.execute(query).mappings()]
+        # An entry caught between being copied and deleted is in both; keep the hot one
+        hot_ids = {item["id"] for item in items}
+        items += [item for item in archived if item["id"] not in hot_ids]
+        items.sort(key=lambda item: item["id"], reverse=True)
+
+    next_cursor = items[limit - 1]["id"] if len(items) > limit else None
+    return {"items": items[:limit], "next_cursor": next_cursor}
+
+
+def _archive_loop():
+    while True:
+        try:
+            start = time.time()
+            moved = archive_logs()
+            if moved:
+                print(f"Archived {moved} log entries in {time.time() - start:.2f} seconds")
+        except Exception as e:
+            print(f"Log archiving failed: {e}")
+        time.sleep(LOG_ARCHIVE_INTERVAL_HOURS * 3600)
+
+
+def start_archive_thread():
+    t = threading.Thread(target=_archive_loop, name="log-archiver", daemon=True)
+    t.start()
@@ -1,44 +1,152 @@
+import os
+import queue
 import threading
 import time
-from datetime import datetime, timedelta
+from collections import deque
+from typing import Deque, Dict, Optional, Set, Tuple
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import sessionmaker
 from backend.models.database import engine
-from backend.models.log import LogEntry
 from backend.models.monitored_user import MonitoredUser
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-THRESHOLD = 1  # actions
-WINDOW_MINUTES = 0.3  # time window in minutes (30 seconds)
+# Detection rules: action -> (threshold, window in seconds). A user is flagged
+# as soon as they perform more than `threshold` actions of that type within
+# the window; "*" counts all actions together. Override with e.g.
+# MONITOR_RULES="*=1/18,delete_contact=5/60".
+DEFAULT_RULES = "*=1/18"
 
 
-def monitor_logs():
-    while True:
-        db = SessionLocal()
+def parse_rules(spec: str) -> Dict[str, Tuple[int, float]]:
+    rules = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
         try:
-            now = datetime.now()
-            window_start = now - timedelta(minutes=WINDOW_MINUTES)
-            # Count actions per user in the last WINDOW_MINUTES
-            user_actions = (
-                db.query(LogEntry.user_id)
-                .filter(LogEntry.timestamp >= window_start)
-                .all()
+            action, limit = item.split("=", 1)
+            threshold, window = limit.split("/", 1)
+            threshold, window = int(threshold), float(window)
+        except ValueError:
+            raise ValueError(f"Invalid monitoring rule '{item}', expected action=threshold/seconds")
+        # A threshold of 0 would flag every user on their first action
+        if not action.strip() or threshold < 1 or window < 1:
+            raise ValueError(
+                f"Invalid monitoring rule '{item}': needs an action, and threshold and seconds of at least 1"
             )
-            # Count actions per user
-            from collections import Counter
-            counts = Counter([ua[0] for ua in user_actions])
-            for user_id, count in counts.items():
-                if count > THRESHOLD:
-                    # Check if already monitored
-                    exists = db.query(MonitoredUser).filter_by(user_id=user_id).first()
-                    if not exists:
-                        monitored = MonitoredUser(user_id=user_id, reason=f"{count} actions in {WINDOW_MINUTES} min")
-                        db.add(monitored)
-                        db.commit()
+        rules[action.strip()] = (threshold, window)
+    return rules
+
+
+MONITOR_RULES = parse_rules(os.environ.get("MONITOR_RULES", DEFAULT_RULES))
+
+# Windows that saw no activity for this long are dropped from memory
+IDLE_SWEEP_INTERVAL = 60
+
+
+class ActivityMonitor:
+    """
+    Sliding-window action counters fed by log_action.
+
+    For each (user, rule) the timestamps of the last threshold + 1 actions
+    are kept in a ring buffer. When the buffer is full and its oldest entry
+    is still inside the window, the user has exceeded the threshold, so a
+    check costs O(1) per action and detection is immediate. Flagged users are
+    written to monitored_users by a background thread.
+    """
+
+    def __init__(self, rules: Dict[str, Tuple[int, float]] = MONITOR_RULES):
+        self.rules = rules
+        self._windows: Dict[Tuple[int, str], Deque[float]] = {}
+        self._flagged: Set[int] = set()
+        self._lock = threading.Lock()
+        self._pending: "queue.Queue[Tuple[int, str]]" = queue.Queue()
+        self._last_sweep = time.monotonic()
+        self._writer: Optional[threading.Thread] = None
+
+    def record(self, user_id: int, action: str):
+        """Count one action and flag the user if it crosses a threshold"""
+        now = time.monotonic()
+        with self._lock:
+            if user_id in self._flagged:
+                return
+            for rule in (action, "*"):
+                if rule not in self.rules:
+                    continue
+                threshold, window = self.rules[rule]
+                key = (user_id, rule)
+                timestamps = self._windows.get(key)
+                if timestamps is None:
+                    timestamps = self._windows[key] = deque(maxlen=threshold + 1)
+                timestamps.append(now)
+                if len(timestamps) == timestamps.maxlen and now - timestamps[0] <= window:
+                    label = "actions" if rule == "*" else f"{rule} actions"
+                    self._flag(user_id, f"{len(timestamps)} {label} in {window:g}s")
+                    break
+            if now - self._last_sweep > IDLE_SWEEP_INTERVAL:
+                self._sweep(now)
+
+    def _flag(self, user_id: int, reason: str):
+        self._flagged.add(user_id)
+        for rule in self.rules:
+            self._windows.pop((user_id, rule), None)
+        self._pending.put((user_id, reason))
+
+    def _sweep(self, now: float):
+        self._last_sweep = now
+        idle = [
+            key for key, timestamps in self._windows.items()
+            if now - timestamps[-1] > self.rules[key[1]][1]
+        ]
+        for key in idle:
+            del self._windows[key]
+
+    def load_flagged(self):
+        """Skip users that were flagged in an earlier run"""
+        db = SessionLocal()
+        try:
+            user_ids = [row[0] for row in db.query(MonitoredUser.user_id).all()]
         finally:
             db.close()
-        time.sleep(10)  # Run every 30 seconds instead of 60
+        with self._lock:
+            self._flagged.update(user_ids)
+
+    def _persist_loop(self):
+        while True:
+            user_id, reason = self._pending.get()
+            db = SessionLocal()
+            try:
+                if not db.query(MonitoredUser.id).filter_by(user_id=user_id).first():
+                    db.add(MonitoredUser(user_id=user_id, reason=reason))
+                    db.commit()
+                    print(f"Monitoring: flagged user {user_id} ({reason})")
+            except IntegrityError:
+                # Already recorded, e.g. by another worker
+                db.rollback()
+            except Exception as e:
+                db.rollback()
+                print(f"Monitoring: failed to record user {user_id}: {e}")
+            finally:
+                db.close()
+                self._pending.task_done()
+
+    def start(self):
+        if self._writer is None:
+            self.load_flagged()
+            self._writer = threading.Thread(target=self._persist_loop, name="monitoring-writer", daemon=True)
+            self._writer.start()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "rules": {action: {"threshold": t, "window_seconds": w} for action, (t, w) in self.rules.items()},
+                "tracked_windows": len(self._windows),
+                "flagged_users": len(self._flagged),
+                "pending_writes": self._pending.qsize()
+            }
+
+
+# Create a global instance of the monitor
+activity_monitor = ActivityMonitor()
+
 
 def start_monitoring_thread():
-    t = threading.Thread(target=monitor_logs, daemon=True)
-    t.start() 
\ No newline at end of file
+    activity_monitor.start()
@@ -0,0 +1,156 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+from passlib.registry import get_crypt_handler
+
+# Hashing parameters. Changing them is safe: existing hashes still verify and
+# are transparently rehashed with the new parameters on the next login.
+# Rounds mean something different per scheme (sha256_crypt: iterations,
+# 535000 by default; bcrypt: log2 cost, 12 by default); unset uses the
+# scheme's own default.
+PASSWORD_SCHEME = os.environ.get("PASSWORD_SCHEME", "sha256_crypt")
+PASSWORD_ROUNDS = int(os.environ["PASSWORD_ROUNDS"]) if os.environ.get("PASSWORD_ROUNDS") else None
+
+# Hashing is CPU-bound, so it runs in its own processes instead of the
+# request threads. At most PASSWORD_MAX_PENDING hash/verify calls may be
+# queued or running; beyond that callers get PasswordHasherBusy (HTTP 503).
+PASSWORD_WORKERS = int(os.environ.get("PASSWORD_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+PASSWORD_MAX_PENDING = int(os.environ.get("PASSWORD_MAX_PENDING", str(PASSWORD_WORKERS * 8)))
+
+# Seconds a caller waits for a result before giving up
+PASSWORD_TIMEOUT = float(os.environ.get("PASSWORD_TIMEOUT", "30"))
+
+
+def build_context(scheme: str = PASSWORD_SCHEME, rounds: Optional[int] = PASSWORD_ROUNDS) -> CryptContext:
+    handler = get_crypt_handler(scheme)
+    if "rounds" in handler.setting_kwds:
+        rounds = handler.default_rounds if rounds is None else rounds
+        if not handler.min_rounds <= rounds <= handler.max_rounds:
+            raise ValueError(
+                f"PASSWORD_ROUNDS={rounds} is out of range for {scheme} "
+                f"({handler.min_rounds}..{handler.max_rounds})"
+            )
+        # Hashes with any other number of rounds are flagged for rehashing
+        settings = {f"{scheme}__{option}": rounds for option in ("default_rounds", "min_rounds", "max_rounds")}
+    elif rounds is not None:
+        raise ValueError(f"{scheme} has no rounds setting, unset PASSWORD_ROUNDS")
+    else:
+        settings = {}
+    # Hashes made before a scheme change still verify through sha256_crypt
+    schemes = [scheme] + (["sha256_crypt"] if scheme != "sha256_crypt" else [])
+    return CryptContext(schemes=schemes, deprecated="auto", **settings)
+
+
+pwd_context = build_context()
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify_and_update(password: str, password_hash: str) -> Tuple[bool, Optional[str]]:
+    try:
+        return pwd_context.verify_and_update(password, password_hash)
+    except ValueError:
+        # Malformed or unknown hash
+        return False, None
+
+
+class PasswordHasher:
+    """Runs hashing and verification in a bounded process pool"""
+
+    def __init__(self, workers: int = PASSWORD_WORKERS, max_pending: int = PASSWORD_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.rejected = 0
+        self.restarts = 0
+
+    def _submit(self, fn, *args):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise PasswordHasherBusy("Too many logins in progress, try again shortly")
+            if self._executor is None:
+                # Started on first use; "spawn" keeps the workers clear of the
+                # server's threads and open database connections
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            executor = self._executor
+            self.pending += 1
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self._done()
+            self._discard(executor)
+            raise PasswordHasherBusy("Password hashing is restarting, try again shortly")
+        except BaseException:
+            self._done()
+            raise
+        future.add_done_callback(lambda _: self._done())
+        try:
+            return future.result(timeout=PASSWORD_TIMEOUT)
+        except FutureTimeoutError:
+            # Still queued behind the other calls: drop it, nobody waits for it
+            future.cancel()
+            with self._lock:
+                self.rejected += 1
+            raise PasswordHasherBusy("Logins are taking too long, try again shortly")
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed), which breaks the whole pool
+            self._discard(executor)
+            raise PasswordHasherBusy("Password hashing is restarting, try again shortly")
+
+    def _discard(self, executor: ProcessPoolExecutor):
+        """Drop a broken pool so the next call starts a fresh one"""
+        with self._lock:
+            if self._executor is not executor:
+                # Already replaced by another caller
+                return
+            self._executor = None
+            self.restarts += 1
+        print("Password hasher: a worker process died, restarting the pool")
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _done(self):
+        with self._lock:
+            self.pending -= 1
+
+    def hash(self, password: str) -> str:
+        return self._submit(_hash, password)
+
+    def verify_and_update(self, password: str, password_hash: str) -> Tuple[bool, Optional[str]]:
+        """Check a password; also returns a new hash when the stored one uses outdated parameters"""
+        return self._submit(_verify_and_update, password, password_hash)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "pending": self.pending,
+                "max_pending": self.max_pending,
+                "rejected": self.rejected,
+                "restarts": self.restarts
+            }
+
+
+# Create a global instance of the hasher
+password_hasher = PasswordHasher()
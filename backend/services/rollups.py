@@ -0,0 +1,106 @@
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Tuple, Union
+from sqlalchemy import text
+
+# Maintenance of the transaction_daily_rollups table. Inserts are merged into
+# the day's row incrementally; deletes recompute the affected days, since min
+# and max can't be un-applied. Only plain SQL is used here so the dataset
+# generator can share these helpers.
+
+ROLLUP_TABLE = "transaction_daily_rollups"
+
+# Columns of a rollup row, in the order daily_totals() produces them
+ROLLUP_COLUMNS = ("transaction_count", "total_amount", "positive_count",
+                  "negative_count", "min_amount", "max_amount")
+
+MERGE_SQL = text(f"""
+    INSERT INTO {ROLLUP_TABLE}
+        (day, transaction_count, total_amount, positive_count, negative_count, min_amount, max_amount)
+    VALUES
+        (:day, :transaction_count, :total_amount, :positive_count, :negative_count, :min_amount, :max_amount)
+    ON CONFLICT(day) DO UPDATE SET
+        transaction_count = transaction_count + excluded.transaction_count,
+        total_amount = total_amount + excluded.total_amount,
+        positive_count = positive_count + excluded.positive_count,
+        negative_count = negative_count + excluded.negative_count,
+        min_amount = min(coalesce(min_amount, excluded.min_amount), excluded.min_amount),
+        max_amount = max(coalesce(max_amount, excluded.max_amount), excluded.max_amount)
+""")
+
+# Aggregate straight from transactions; `where` narrows it to some days
+AGGREGATE_SQL = f"""
+    INSERT INTO {ROLLUP_TABLE}
+        (day, transaction_count, total_amount, positive_count, negative_count, min_amount, max_amount)
+    SELECT date(date), count(*), sum(amount),
+           sum(CASE WHEN amount > 0 THEN 1 ELSE 0 END),
+           sum(CASE WHEN amount < 0 THEN 1 ELSE 0 END),
+           min(amount), max(amount)
+    FROM transactions
+    {{where}}
+    GROUP BY date(date)
+"""
+
+
+def day_key(value: Union[datetime, date]) -> str:
+    """Rollup key (ISO date) for a transaction timestamp"""
+    if isinstance(value, datetime):
+        value = value.date()
+    return value.isoformat()
+
+
+def daily_totals(transactions: Iterable[Tuple[Union[datetime, date], float]]) -> Dict[str, List]:
+    """Fold (date, amount) pairs into per-day rollup values"""
+    totals: Dict[str, List] = {}
+    for when, amount in transactions:
+        key = day_key(when)
+        row = totals.get(key)
+        if row is None:
+            totals[key] = [1, amount, int(amount > 0), int(amount < 0), amount, amount]
+        else:
+            row[0] += 1
+            row[1] += amount
+            row[2] += amount > 0
+            row[3] += amount < 0
+            row[4] = min(row[4], amount)
+            row[5] = max(row[5], amount)
+    return totals
+
+
+def record_transactions(db, transactions: Iterable[Tuple[Union[datetime, date], float]]) -> None:
+    """Merge new transactions into their days' rollups (in the caller's transaction)"""
+    totals = daily_totals(transactions)
+    if not totals:
+        return
+    db.execute(MERGE_SQL, [
+        {"day": day, **dict(zip(ROLLUP_COLUMNS, values))}
+        for day, values in totals.items()
+    ])
+
+
+def recompute_days(db, days: Iterable[Union[datetime, date, str]]) -> None:
+    """Rebuild the rollups of specific days from the transactions table"""
+    keys = sorted({d if isinstance(d, str) else day_key(d) for d in days})
+    for key in keys:
+        params = {"day": key}
+        db.execute(text(f"DELETE FROM {ROLLUP_TABLE} WHERE day = :day"), params)
+        # The range form lets SQLite use the date index
+        db.execute(text(AGGREGATE_SQL.format(
+            where="WHERE date >= :day AND date < date(:day, '+1 day')"
+        )), params)
+
+
+def backfill(db) -> int:
+    """Rebuild the whole rollup table from transactions, returning the number of days"""
+    db.execute(text(f"DELETE FROM {ROLLUP_TABLE}"))
+    db.execute(text(AGGREGATE_SQL.format(where="")))
+    return db.execute(text(f"SELECT count(*) FROM {ROLLUP_TABLE}")).scalar()
+
+
+def ensure_backfilled(db) -> bool:
+    """Backfill once for databases that have transactions but no rollups yet"""
+    has_rollups = db.execute(text(f"SELECT 1 FROM {ROLLUP_TABLE} LIMIT 1")).first()
+    has_transactions = db.execute(text("SELECT 1 FROM transactions LIMIT 1")).first()
+    if has_rollups or not has_transactions:
+        return False
+    backfill(db)
+    return True
@@ -0,0 +1,240 @@
+import errno
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+# Same import dance as Starlette's own form parser
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ModuleNotFoundError:
+    from multipart.multipart import MultipartParser, parse_options_header
+
+# Uploads are read, hashed and written this many bytes at a time
+UPLOAD_CHUNK_SIZE = int(os.environ.get("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+
+# Largest accepted upload; enforced while streaming, before it's all on disk
+MAX_UPLOAD_SIZE = int(os.environ.get("MAX_UPLOAD_SIZE", str(1024 * 1024 * 1024)))
+
+# Room for the multipart boundaries and part headers around the file, when
+# judging a request by its Content-Length
+MULTIPART_OVERHEAD = 64 * 1024
+
+# Partial uploads are written here, outside the directory served at /uploads.
+# Keep it on the same filesystem as the uploads so finished files can be
+# renamed into place (otherwise they are copied).
+UPLOAD_TMP_DIR = Path(os.environ.get("UPLOAD_TMP_DIR", "upload_tmp"))
+
+# Content-addressed files are named by their SHA-256, e.g. ab/ab12...ef.mp4
+CONTENT_NAME = re.compile(r"^[0-9a-f]{64}$")
+SAFE_SUFFIX = re.compile(r"^\.[a-z0-9]{1,10}$")
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class InvalidUpload(Exception):
+    pass
+
+
+def content_path(digest: str, suffix: str) -> Path:
+    return Path(digest[:2]) / f"{digest}{suffix}"
+
+
+class MultipartFileStream:
+    """
+    The bytes of one file field of a multipart/form-data request, read
+    straight from the request body.
+
+    Starlette's form parsing would spool the whole body to a temporary file
+    before the handler runs; this yields the file's data as it arrives, so a
+    size limit can stop the transfer part way. `filename` is set once the
+    part's headers have been read.
+    """
+
+    def __init__(self, request: Request, field: str = "file"):
+        self.request = request
+        self.field = field.encode()
+        self.filename: Optional[str] = None
+        self.found = False
+
+        content_type, params = parse_options_header(request.headers.get("content-type", ""))
+        if content_type != b"multipart/form-data" or not params.get(b"boundary"):
+            raise InvalidUpload("Expected a multipart/form-data upload")
+        self._boundary = params[b"boundary"]
+
+    def _parser(self, data: List[bytes]) -> MultipartParser:
+        part = {"headers": {}, "field": b"", "value": b"", "wanted": False}
+
+        def on_part_begin():
+            part["headers"] = {}
+
+        def on_header_field(buf, start, end):
+            part["field"] += buf[start:end]
+
+        def on_header_value(buf, start, end):
+            part["value"] += buf[start:end]
+
+        def on_header_end():
+            part["headers"][part["field"].lower()] = part["value"]
+            part["field"] = part["value"] = b""
+
+        def on_headers_finished():
+            _, options = parse_options_header(part["headers"].get(b"content-disposition", b""))
+            # Only the first part carrying the file; other fields are skipped
+            part["wanted"] = not self.found and options.get(b"name") == self.field and b"filename" in options
+            if part["wanted"]:
+                self.found = True
+                self.filename = options[b"filename"].decode("utf-8", "replace")
+
+        def on_part_data(buf, start, end):
+            if part["wanted"]:
+                data.append(bytes(buf[start:end]))
+
+        def on_part_end():
+            part["wanted"] = False
+
+        return MultipartParser(self._boundary, callbacks={
+            "on_part_begin": on_part_begin,
+            "on_header_field": on_header_field,
+            "on_header_value": on_header_value,
+            "on_header_end": on_header_end,
+            "on_headers_finished": on_headers_finished,
+            "on_part_data": on_part_data,
+            "on_part_end": on_part_end,
+        })
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        data: List[bytes] = []
+        parser = self._parser(data)
+        async for body in self.request.stream():
+            parser.write(body)
+            if data:
+                yield b"".join(data)
+                data.clear()
+        parser.finalize()
+        if data:
+            yield b"".join(data)
+        if not self.found:
+            raise InvalidUpload(f"No '{self.field.decode()}' file in the upload")
+
+
+def _move_into_place(tmp_path: str, final_path: Path):
+    try:
+        os.replace(tmp_path, final_path)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        # Different filesystems: copy next to the target first, so the
+        # content-addressed name only ever points at a complete file
+        fd, staged = tempfile.mkstemp(dir=final_path.parent)
+        os.close(fd)
+        try:
+            shutil.copyfile(tmp_path, staged)
+            os.replace(staged, final_path)
+        except BaseException:
+            os.remove(staged)
+            raise
+        os.remove(tmp_path)
+
+
+async def store_upload(request: Request, upload_dir: Path, max_size: Optional[int] = None,
+                       tmp_dir: Path = UPLOAD_TMP_DIR) -> Dict[str, Any]:
+    """
+    Stream the file of a multipart upload request to disk under its content hash.
+
+    Requests whose Content-Length already exceeds the limit are refused
+    before anything is read; otherwise the limit is checked chunk by chunk.
+    The file is written to a temporary file while being hashed, then moved
+    to <sha[:2]>/<sha><ext>. An identical file that is already stored is
+    reused, so duplicates take no extra space.
+    """
+    max_size = max_size or MAX_UPLOAD_SIZE
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > max_size + MULTIPART_OVERHEAD:
+        raise UploadTooLarge(f"Upload exceeds the {max_size} byte limit")
+    stream = MultipartFileStream(request)
+
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+    digest = hashlib.sha256()
+    size = 0
+
+    def write_chunk(out, chunk: bytes):
+        digest.update(chunk)
+        out.write(chunk)
+
+    try:
+        with os.fdopen(fd, "wb") as out:
+            async for chunk in stream:
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLarge(f"Upload exceeds the {max_size} byte limit")
+                await run_in_threadpool(write_chunk, out, chunk)
+
+        suffix = Path(stream.filename or "").suffix.lower()
+        if not SAFE_SUFFIX.match(suffix):
+            suffix = ""
+        sha = digest.hexdigest()
+        relative = content_path(sha, suffix)
+        final_path = upload_dir / relative
+        deduplicated = final_path.exists()
+        if deduplicated:
+            os.remove(tmp_path)
+        else:
+            final_path.parent.mkdir(parents=True, exist_ok=True)
+            await run_in_threadpool(_move_into_place, tmp_path, final_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return {
+        "filename": stream.filename,
+        "path": f"/uploads/{relative.as_posix()}",
+        "sha256": sha,
+        "size": size,
+        "etag": f'"{sha}"',
+        "deduplicated": deduplicated
+    }
+
+
+def content_etag(full_path) -> Optional[str]:
+    """Strong ETag for a content-addressed file, None for anything else"""
+    name = Path(full_path).name.split(".", 1)[0]
+    return f'"{name}"' if CONTENT_NAME.match(name) else None
+
+
+class UploadStaticFiles(StaticFiles):
+    """
+    StaticFiles that serves content-addressed uploads with their hash as a
+    strong ETag, so If-None-Match and If-Range work across servers and
+    restarts. The content at such a path never changes, so it is cacheable
+    forever. Other files keep Starlette's mtime/size based ETag.
+    """
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope, status_code: int = 200) -> Response:
+        etag = content_etag(full_path)
+        if etag is None:
+            return super().file_response(full_path, stat_result, scope, status_code)
+
+        request_headers = Headers(scope=scope)
+        response = FileResponse(
+            full_path,
+            status_code=status_code,
+            stat_result=stat_result,
+            headers={"etag": etag, "cache-control": "public, max-age=31536000, immutable"}
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,228 @@
+import asyncio
+import json
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Union
+
+from fastapi import WebSocket, WebSocketDisconnect
+from starlette.websockets import WebSocketState
+
+from backend.services.events import is_valid_topic
+
+# Messages waiting to be sent to one client; a client that lets its queue
+# fill up is too slow to keep up and gets disconnected
+WS_SEND_QUEUE_SIZE = int(os.environ.get("WS_SEND_QUEUE_SIZE", "256"))
+
+# Seconds a single send may take before the client is considered stuck
+WS_SEND_TIMEOUT = float(os.environ.get("WS_SEND_TIMEOUT", "10"))
+
+# Heartbeat: a ping is queued every interval, and clients that haven't sent
+# anything (a pong or any other message) within the timeout are dropped
+WS_PING_INTERVAL = float(os.environ.get("WS_PING_INTERVAL", "20"))
+WS_PING_TIMEOUT = float(os.environ.get("WS_PING_TIMEOUT", "60"))
+
+WS_MAX_CONNECTIONS = int(os.environ.get("WS_MAX_CONNECTIONS", "1000"))
+
+# Topics a single client may be subscribed to at once
+WS_MAX_SUBSCRIPTIONS = int(os.environ.get("WS_MAX_SUBSCRIPTIONS", "100"))
+
+# Close codes: 1008 policy violation (too slow / unresponsive), 1013 try again later
+CLOSE_SLOW_CONSUMER = 1008
+CLOSE_TRY_AGAIN_LATER = 1013
+
+PING_MESSAGE = json.dumps({"type": "ping"})
+
+
+class Connection:
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=WS_SEND_QUEUE_SIZE)
+        self.last_seen = time.monotonic()
+        self.sender: Optional[asyncio.Task] = None
+        self.topics: Set[str] = set()
+
+
+class ConnectionManager:
+    """
+    Tracks WebSocket clients and their topic subscriptions, and fans
+    messages out to them.
+
+    Each client has a bounded send queue drained by its own task, so
+    publish() only enqueues and a slow client never delays the others.
+
+    Clients talk to the server with small JSON messages:
+        {"type": "subscribe", "topics": ["contacts", "contact:12"]}
+        {"type": "unsubscribe", "topics": ["contact:12"]}
+        {"type": "pong"}
+    and receive only events published on topics they subscribed to.
+    """
+
+    def __init__(self):
+        self.active_connections: Dict[WebSocket, Connection] = {}
+        self.subscribers: Dict[str, Set[Connection]] = {}
+        self._heartbeat: Optional[asyncio.Task] = None
+        # The event loop only keeps weak references to tasks, so pending
+        # closes are held here until they finish
+        self._closing: Set[asyncio.Task] = set()
+        self.evicted = 0
+        self.rejected = 0
+
+    async def serve(self, websocket: WebSocket):
+        """Run one client connection until it ends, however it ends"""
+        if not await self.connect(websocket):
+            return
+        try:
+            while True:
+                data = await websocket.receive_text()
+                self.handle_message(websocket, data)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            self.disconnect(websocket)
+
+    async def connect(self, websocket: WebSocket) -> bool:
+        """Accept a client, or refuse it when the connection cap is reached"""
+        # Accepted either way: closing before the handshake completes would
+        # send an HTTP 403 instead of the close code
+        await websocket.accept()
+        if len(self.active_connections) >= WS_MAX_CONNECTIONS:
+            self.rejected += 1
+            await websocket.close(code=CLOSE_TRY_AGAIN_LATER)
+            return False
+
+        connection = Connection(websocket)
+        connection.sender = asyncio.create_task(self._send_loop(connection))
+        self.active_connections[websocket] = connection
+
+        if self._heartbeat is None or self._heartbeat.done():
+            self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+        return True
+
+    def disconnect(self, websocket: WebSocket):
+        connection = self.active_connections.pop(websocket, None)
+        if connection is None:
+            return
+        self._unsubscribe(connection, list(connection.topics))
+        if connection.sender and connection.sender is not asyncio.current_task():
+            connection.sender.cancel()
+
+    def handle_message(self, websocket: WebSocket, data: str):
+        """Process one message received from a client"""
+        connection = self.active_connections.get(websocket)
+        if connection is None:
+            return
+        connection.last_seen = time.monotonic()
+
+        try:
+            message = json.loads(data)
+        except ValueError:
+            message = None
+        if not isinstance(message, dict):
+            self._reply(connection, {"type": "error", "detail": "Messages must be JSON objects"})
+            return
+
+        kind = message.get("type")
+        if kind == "pong":
+            return
+        if kind in ("subscribe", "unsubscribe"):
+            topics = message.get("topics")
+            if not isinstance(topics, list) or not all(is_valid_topic(t) for t in topics):
+                self._reply(connection, {"type": "error", "detail": "Invalid topics"})
+                return
+            if kind == "unsubscribe":
+                self._unsubscribe(connection, topics)
+            elif len(connection.topics | set(topics)) > WS_MAX_SUBSCRIPTIONS:
+                self._reply(connection, {"type": "error", "detail": f"At most {WS_MAX_SUBSCRIPTIONS} topics per connection"})
+                return
+            else:
+                self._subscribe(connection, topics)
+            self._reply(connection, {"type": "subscribed", "topics": sorted(connection.topics)})
+            return
+        self._reply(connection, {"type": "error", "detail": f"Unknown message type: {kind}"})
+
+    def _subscribe(self, connection: Connection, topics: Iterable[str]):
+        for topic in topics:
+            connection.topics.add(topic)
+            self.subscribers.setdefault(topic, set()).add(connection)
+
+    def _unsubscribe(self, connection: Connection, topics: Iterable[str]):
+        for topic in topics:
+            connection.topics.discard(topic)
+            subscribers = self.subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.discard(connection)
+                if not subscribers:
+                    del self.subscribers[topic]
+
+    def _reply(self, connection: Connection, message: Dict[str, Any]):
+        self._enqueue(connection, json.dumps(message))
+
+    def publish(self, topics: List[str], message: Union[str, Dict[str, Any]]):
+        """Queue a message for every client subscribed to any of `topics`.
+
+        Dict messages are serialized once here, not once per client, and a
+        client subscribed to several of the topics gets the message once.
+        """
+        if not isinstance(message, str):
+            message = json.dumps(message, default=str)
+        recipients: Set[Connection] = set()
+        for topic in topics:
+            recipients.update(self.subscribers.get(topic, ()))
+        for connection in recipients:
+            self._enqueue(connection, message)
+
+    def _enqueue(self, connection: Connection, message: str):
+        try:
+            connection.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self._evict(connection, CLOSE_SLOW_CONSUMER)
+
+    def _evict(self, connection: Connection, code: int):
+        self.evicted += 1
+        self.disconnect(connection.websocket)
+        task = asyncio.create_task(self._close(connection.websocket, code))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def _close(self, websocket: WebSocket, code: int):
+        try:
+            if websocket.application_state == WebSocketState.CONNECTED:
+                await websocket.close(code=code)
+        except Exception:
+            pass
+
+    async def _send_loop(self, connection: Connection):
+        try:
+            while True:
+                message = await connection.queue.get()
+                await asyncio.wait_for(connection.websocket.send_text(message), WS_SEND_TIMEOUT)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Disconnected or stuck; either way this client is done
+            if connection.websocket in self.active_connections:
+                self._evict(connection, CLOSE_SLOW_CONSUMER)
+
+    async def _heartbeat_loop(self):
+        while self.active_connections:
+            await asyncio.sleep(WS_PING_INTERVAL)
+            now = time.monotonic()
+            for connection in list(self.active_connections.values()):
+                if now - connection.last_seen > WS_PING_TIMEOUT:
+                    self._evict(connection, CLOSE_SLOW_CONSUMER)
+                else:
+                    self._enqueue(connection, PING_MESSAGE)
+
+    def stats(self) -> Dict[str, Any]:
+        depths = [c.queue.qsize() for c in self.active_connections.values()]
+        return {
+            "connections": len(depths),
+            "max_queue_depth": max(depths, default=0),
+            "queued_messages": sum(depths),
+            "topics": len(self.subscribers),
+            "evicted": self.evicted,
+            "rejected": self.rejected
+        }
+
+
+manager = ConnectionManager()
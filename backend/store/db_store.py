@@ -1,41 +1,287 @@
-from typing import List, Optional, Dict, Any
-from sqlalchemy.orm import Session
+from typing import List, Optional, Dict, Any, Tuple
+from sqlalchemy.orm import Session, load_only, selectinload
+from sqlalchemy import and_, or_, func, text, update
+import base64
+import binascii
 import json
+import os
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
 
 from backend.models.contact import ContactDB, ContactCreate, ContactUpdate, TransactionDB, TransactionCreate
 from backend.models.database import get_db
+from backend.models.search import contact_search_filter
+from backend.services import rollups
+from backend.services.analytics_cache import analytics_cache
+from backend.services.events import event_bus, CONTACTS_TOPIC, ANALYTICS_TOPIC, INVALIDATION_TOPIC, contact_topic
+
+# Fields a contact list can return: the contact columns plus aggregates
+# computed over its transactions
+CONTACT_FIELDS = [c.name for c in ContactDB.__table__.columns]
+SUMMARY_FIELDS = ["transaction_count", "balance", "last_transaction_date"]
+LIST_FIELDS = CONTACT_FIELDS + SUMMARY_FIELDS
+
+# Cached contact counts expire after this many seconds so rows written outside
+# the store (dataset generator, manual SQL) are eventually picked up
+COUNT_CACHE_TTL = float(os.environ.get("COUNT_CACHE_TTL", "300"))
+COUNT_CACHE_SIZE = int(os.environ.get("COUNT_CACHE_SIZE", "1024"))
+
+COUNT_MODES = ("exact", "estimate", "none")
+
+def derive_tag(name: str, phone: str) -> str:
+    """Default tag: first two letters of the name, last two digits of the phone, last two letters of the name"""
+    first_two = name[:2] if len(name) >= 2 else name
+    last_two_digits = phone[-2:] if len(phone) >= 2 else phone
+    last_two_name = name[-2:] if len(name) >= 2 else name
+    return f"{first_two}{last_two_digits}{last_two_name}"
 
 class DBStore:
-    def get_all_contacts(self, db: Session, search: Optional[str] = None, sort_by: Optional[str] = None, 
-                        page: Optional[int] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
-        query = db.query(ContactDB)
-        
-        # Apply search filter if provided
+    def __init__(self):
+        # normalized search term -> (count, time cached)
+        self._count_cache: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self._count_lock = threading.Lock()
+
+    def invalidate_counts(self):
+        """Forget all cached contact counts, called whenever contacts are added, removed or renamed"""
+        with self._count_lock:
+            self._count_cache.clear()
+
+    def invalidate_caches(self, counts: bool = True):
+        """Drop cached analytics (and contact counts) after a committed write, in every worker"""
+        if counts:
+            self.invalidate_counts()
+        analytics_cache.invalidate()
+        event_bus.publish([INVALIDATION_TOPIC], {"type": "caches_invalidated", "counts": counts})
+
+    def publish_change(self, event_type: str, contact_id: int, data: Dict[str, Any]):
+        """Tell subscribers about a committed change to a contact or its transactions"""
+        event_bus.publish([CONTACTS_TOPIC, contact_topic(contact_id)], {"type": event_type, "data": data})
+
+    def publish_analytics_changed(self):
+        event_bus.publish([ANALYTICS_TOPIC], {"type": "analytics_changed", "data": {"version": analytics_cache.version}})
+
+    def _contact_event_data(self, contact: ContactDB) -> Dict[str, Any]:
+        # Events carry the contact row only, not its whole transaction history
+        return {name: getattr(contact, name) for name in CONTACT_FIELDS}
+
+    def _normalize_search(self, search: Optional[str]) -> str:
+        return (search or "").strip().lower()
+
+    def _cached_count(self, key: str, allow_stale: bool = False) -> Optional[int]:
+        with self._count_lock:
+            entry = self._count_cache.get(key)
+            if entry is None:
+                return None
+            count, cached_at = entry
+            if not allow_stale and time.monotonic() - cached_at > COUNT_CACHE_TTL:
+                return None
+            self._count_cache.move_to_end(key)
+            return count
+
+    def _store_count(self, key: str, count: int):
+        with self._count_lock:
+            self._count_cache[key] = (count, time.monotonic())
+            self._count_cache.move_to_end(key)
+            while len(self._count_cache) > COUNT_CACHE_SIZE:
+                self._count_cache.popitem(last=False)
+
+    def _sort_spec(self, sort_by: Optional[str]) -> Tuple[str, bool]:
+        """Resolve a sort parameter into a contact column name and direction"""
+        reverse = False
+        if sort_by and sort_by.startswith('-'):
+            reverse = True
+            sort_by = sort_by[1:]
+
+        # Only real columns can be sorted on, anything else falls back to id
+        if not sort_by or sort_by not in ContactDB.__table__.columns:
+            return "id", reverse
+        return sort_by, reverse
+
+    def _encode_cursor(self, sort_by: str, reverse: bool, contact: ContactDB) -> str:
+        """Build an opaque cursor from the sort key and id of the last contact on a page"""
+        key = getattr(contact, sort_by)
+        if isinstance(key, datetime):
+            key = key.isoformat()
+        payload = {"s": f"-{sort_by}" if reverse else sort_by, "k": key, "i": contact.id}
+        raw = json.dumps(payload, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def _decode_cursor(self, cursor: str, sort_by: str, reverse: bool) -> Tuple[Any, int]:
+        """Decode a cursor, checking that it was issued for the same sort order"""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            payload = json.loads(raw)
+            key, last_id = payload["k"], int(payload["i"])
+        except (binascii.Error, ValueError, KeyError, TypeError):
+            raise ValueError("Invalid cursor")
+
+        if payload.get("s") != (f"-{sort_by}" if reverse else sort_by):
+            raise ValueError("Cursor does not match the requested sort order")
+
+        column = ContactDB.__table__.columns[sort_by]
+        if key is not None and column.type.python_type is datetime:
+            try:
+                key = datetime.fromisoformat(key)
+            except (TypeError, ValueError):
+                raise ValueError("Invalid cursor")
+        return key, last_id
+
+    def _seek_filter(self, sort_by: str, reverse: bool, key: Any, last_id: int):
+        """Filter for rows strictly after (key, id) within the cursor's NULL or non-NULL range.
+
+        Written as `col >= k AND (col > k OR id > i)` rather than an OR of
+        branches, so SQLite can seek into the column's index (which ends in
+        the rowid) instead of scanning it from the start.
+        """
+        column = getattr(ContactDB, sort_by)
+        if sort_by == "id":
+            return ContactDB.id < last_id if reverse else ContactDB.id > last_id
+        if key is None:
+            return and_(column.is_(None), ContactDB.id < last_id if reverse else ContactDB.id > last_id)
+        if reverse:
+            return and_(column <= key, or_(column < key, ContactDB.id < last_id))
+        return and_(column >= key, or_(column > key, ContactDB.id > last_id))
+
+    def _following_range(self, sort_by: str, reverse: bool, key: Any):
+        """Filter for the range that comes after the cursor's one, if any.
+
+        SQLite sorts NULLs first ascending and last descending, so on a
+        nullable column a page can run from the NULL rows into the others
+        (ascending) or from the others into the NULL rows (descending).
+        """
+        column = ContactDB.__table__.columns[sort_by]
+        if not column.nullable or sort_by == "id":
+            return None
+        column = getattr(ContactDB, sort_by)
+        if key is None and not reverse:
+            return column.isnot(None)
+        if key is not None and reverse:
+            return column.is_(None)
+        return None
+
+    def _apply_search(self, query, search: Optional[str]):
+        # Name/phone/tag substring search, served by the FTS index when possible.
+        # Normalized the same way as the count cache key, so a page and its
+        # cached total always describe the same rows.
+        search = self._normalize_search(search)
         if search:
-            search = search.lower()
-            query = query.filter(
-                (ContactDB.name.ilike(f"%{search}%")) |
-                (ContactDB.phone.ilike(f"%{search}%")) |
-                (ContactDB.tag.ilike(f"%{search}%"))
-            )
-        
-        # Apply sorting if provided
-        if sort_by:
-            reverse = False
-            if sort_by.startswith('-'):
-                reverse = True
-                sort_by = sort_by[1:]
-            
-            if hasattr(ContactDB, sort_by):
-                column = getattr(ContactDB, sort_by)
-                query = query.order_by(column.desc() if reverse else column)
-            else:
-                # Default sort by id if invalid column
-                query = query.order_by(ContactDB.id)
+            query = query.filter(contact_search_filter(search))
+        return query
+
+    def _apply_sort(self, query, sort_by: str, reverse: bool):
+        # id is always the tie-breaker so the ordering is total and cursors are stable
+        column = getattr(ContactDB, sort_by)
+        if sort_by == "id":
+            return query.order_by(column.desc() if reverse else column)
+        if reverse:
+            return query.order_by(column.desc(), ContactDB.id.desc())
+        return query.order_by(column, ContactDB.id)
+
+    def _transaction_summaries(self, db: Session, contact_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Aggregate transaction count, balance and last date for a set of contacts in one query"""
+        if not contact_ids:
+            return {}
+        rows = db.query(
+            TransactionDB.contact_id,
+            func.count(TransactionDB.id).label("transaction_count"),
+            func.sum(TransactionDB.amount).label("balance"),
+            func.max(TransactionDB.date).label("last_transaction_date")
+        ).filter(
+            TransactionDB.contact_id.in_(contact_ids)
+        ).group_by(
+            TransactionDB.contact_id
+        ).all()
+        return {
+            row.contact_id: {
+                "transaction_count": row.transaction_count,
+                "balance": float(row.balance) if row.balance else 0,
+                "last_transaction_date": row.last_transaction_date
+            }
+            for row in rows
+        }
+
+    def _contact_summary(self, contact: ContactDB, fields: List[str], summary: Optional[Dict[str, Any]],
+                         include_transactions: bool) -> Dict[str, Any]:
+        summary = summary or {"transaction_count": 0, "balance": 0, "last_transaction_date": None}
+        result = {}
+        for field in fields:
+            result[field] = summary[field] if field in SUMMARY_FIELDS else getattr(contact, field)
+        if include_transactions:
+            result["transaction_history"] = [t.to_dict() for t in contact.transactions]
+        return result
+
+    def get_contacts_page(self, db: Session, search: Optional[str] = None, sort_by: Optional[str] = None,
+                          limit: int = 20, cursor: Optional[str] = None, page: Optional[int] = None,
+                          fields: Optional[List[str]] = None,
+                          include_transactions: bool = False) -> Dict[str, Any]:
+        """Get one page of contact summaries together with the cursor for the next page.
+
+        With a cursor the page is found by seeking on (sort key, id), so deep
+        pages cost the same as the first one. Without a cursor the page number
+        is used as an offset, which keeps old clients working.
+
+        Items carry the requested `fields` (all list fields by default) and
+        only include the full transaction history when asked to.
+        """
+        if fields:
+            unknown = [f for f in fields if f not in LIST_FIELDS]
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+            # id is always returned so clients can address the contact
+            fields = ["id"] + [f for f in dict.fromkeys(fields) if f != "id"]
         else:
-            # Default sort by id
-            query = query.order_by(ContactDB.id)
+            fields = LIST_FIELDS
+
+        sort_by, reverse = self._sort_spec(sort_by)
+        query = self._apply_search(db.query(ContactDB), search)
+
+        # Only load the columns that are returned or needed for the cursor
+        columns = {f for f in fields if f in CONTACT_FIELDS} | {"id", sort_by}
+        query = query.options(load_only(*[getattr(ContactDB, c) for c in columns]))
+        if include_transactions:
+            query = query.options(selectinload(ContactDB.transactions))
+
+        # Fetch one extra row to know whether there is a next page
+        if cursor:
+            key, last_id = self._decode_cursor(cursor, sort_by, reverse)
+            seek = query.filter(self._seek_filter(sort_by, reverse, key, last_id))
+            contacts = self._apply_sort(seek, sort_by, reverse).limit(limit + 1).all()
+            following = self._following_range(sort_by, reverse, key)
+            if following is not None and len(contacts) <= limit:
+                rest = self._apply_sort(query.filter(following), sort_by, reverse)
+                contacts += rest.limit(limit + 1 - len(contacts)).all()
+        else:
+            # The sort has to come before the offset
+            query = self._apply_sort(query, sort_by, reverse)
+            if page is not None and page > 1:
+                query = query.offset((page - 1) * limit)
+            contacts = query.limit(limit + 1).all()
+        has_more = len(contacts) > limit
+        contacts = contacts[:limit]
+
+        next_cursor = None
+        if has_more and contacts:
+            next_cursor = self._encode_cursor(sort_by, reverse, contacts[-1])
+
+        summaries = {}
+        if any(f in SUMMARY_FIELDS for f in fields):
+            summaries = self._transaction_summaries(db, [c.id for c in contacts])
+
+        return {
+            "items": [
+                self._contact_summary(contact, fields, summaries.get(contact.id), include_transactions)
+                for contact in contacts
+            ],
+            "next_cursor": next_cursor
+        }
+
+    def get_all_contacts(self, db: Session, search: Optional[str] = None, sort_by: Optional[str] = None, 
+                        page: Optional[int] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        sort_by, reverse = self._sort_spec(sort_by)
+        query = self._apply_search(db.query(ContactDB), search)
+        query = self._apply_sort(query, sort_by, reverse)
         
         # Apply pagination at the database level if requested
         if page is not None and limit is not None:
@@ -45,6 +291,30 @@ class DBStore:
         contacts = query.all()
         return [contact.to_dict() for contact in contacts]
 
+    def iter_contact_rows(self, db: Session, updated_since: Optional[datetime] = None,
+                          chunk_size: int = 1000):
+        """Yield lists of export rows, streaming contacts from the database in chunks.
+
+        Only the exported columns are selected and rows are fetched with
+        yield_per, so no ORM objects or transactions are loaded.
+        """
+        query = db.query(
+            ContactDB.id, ContactDB.name, ContactDB.phone, ContactDB.email, ContactDB.notes,
+            ContactDB.tag, ContactDB.last_transaction, ContactDB.created_at, ContactDB.updated_at
+        )
+        if updated_since is not None:
+            query = query.filter(ContactDB.updated_at >= updated_since)
+        query = query.order_by(ContactDB.id).yield_per(chunk_size)
+
+        chunk = []
+        for row in query:
+            chunk.append(tuple(row))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
     def get_contact(self, db: Session, contact_id: int) -> Optional[Dict[str, Any]]:
         contact = db.query(ContactDB).filter(ContactDB.id == contact_id).first()
         if contact:
@@ -65,10 +335,15 @@ class DBStore:
         )
         db.add(new_contact)
         db.commit()
+        self.invalidate_caches()
         db.refresh(new_contact)
+        self.publish_change("new_contact", new_contact.id, self._contact_event_data(new_contact))
+        self.publish_analytics_changed()
         return new_contact.to_dict()
 
-    def update_contact(self, db: Session, contact_id: int, contact_data: ContactUpdate) -> Optional[Dict[str, Any]]:
+    def update_contact(self, db: Session, contact_id: int, contact_data: ContactUpdate,
+                       retag: bool = False) -> Optional[Dict[str, Any]]:
+        """Update a contact; with `retag`, a new name or phone also recomputes the tag"""
         # Get existing contact
         contact = db.query(ContactDB).filter(ContactDB.id == contact_id).first()
         if not contact:
@@ -76,13 +351,22 @@ class DBStore:
         
         # Update contact fields
         contact_dict = contact_data.model_dump(exclude_unset=True)
+        changes = {}
         for key, value in contact_dict.items():
             if key != "transaction_history" and value is not None:
                 setattr(contact, key, value)
+                changes[key] = value
+        if retag and {"name", "phone"} & changes.keys():
+            contact.tag = changes["tag"] = derive_tag(contact.name, contact.phone)
         
         contact.updated_at = datetime.now()
         db.commit()
+        # Renames can move a contact in or out of search results
+        self.invalidate_caches(counts=bool({"name", "phone", "tag"} & changes.keys()))
         db.refresh(contact)
+        # Subscribers get only the fields that changed
+        self.publish_change("update_contact", contact_id, {"id": contact_id, **changes, "updated_at": contact.updated_at})
+        self.publish_analytics_changed()
         return contact.to_dict()
 
     def delete_contact(self, db: Session, contact_id: int) -> bool:
@@ -90,8 +374,15 @@ class DBStore:
         if not contact:
             return False
         
+        # Transactions go with the contact, so their days need recomputing
+        days = {t.date for t in contact.transactions if t.date is not None}
         db.delete(contact)
+        db.flush()
+        rollups.recompute_days(db, days)
         db.commit()
+        self.invalidate_caches()
+        self.publish_change("delete_contact", contact_id, {"id": contact_id})
+        self.publish_analytics_changed()
         return True
 
     def add_transaction(self, db: Session, contact_id: int, transaction_data: TransactionCreate) -> Optional[Dict[str, Any]]:
@@ -114,11 +405,81 @@ class DBStore:
         
         # Save to database
         db.add(new_transaction)
+        rollups.record_transactions(db, [(new_transaction.date, new_transaction.amount)])
         db.commit()
+        self.invalidate_caches(counts=False)
         db.refresh(contact)
+        self.publish_change("new_transaction", contact_id, new_transaction.to_dict())
+        self.publish_change("update_contact", contact_id, {
+            "id": contact_id, "last_transaction": contact.last_transaction, "updated_at": contact.updated_at
+        })
+        self.publish_analytics_changed()
         
         return contact.to_dict()
     
+    def bulk_upsert_contacts(self, db: Session, contacts: List[ContactCreate],
+                             upsert_on: Optional[str] = None,
+                             transaction_note: str = "Initial transaction from import") -> Dict[str, int]:
+        """Insert (or update) a batch of contacts with set-based statements.
+
+        With `upsert_on` ("phone" or "email"), contacts whose key already exists
+        are updated in place instead of duplicated; within the batch the last
+        row for a key wins. Every contact with a non-zero last_transaction also
+        gets an initial transaction. Nothing is committed here, so callers
+        decide how many batches share a database transaction.
+        """
+        if not contacts:
+            return {"inserted": 0, "updated": 0}
+        now = datetime.now()
+
+        values = []
+        for contact in contacts:
+            row = contact.model_dump(exclude={"transaction_history"})
+            row["updated_at"] = now
+            values.append(row)
+
+        existing: Dict[str, int] = {}
+        if upsert_on:
+            key_column = getattr(ContactDB, upsert_on)
+            keys = list({row[upsert_on] for row in values})
+            existing = dict(
+                (key, contact_id) for contact_id, key in
+                db.query(ContactDB.id, key_column).filter(key_column.in_(keys)).all()
+            )
+            # Collapse repeated keys inside the batch to their last row
+            values = list({row[upsert_on]: row for row in values}.values())
+
+        to_insert = [row for row in values if not upsert_on or row[upsert_on] not in existing]
+        to_update = [
+            {**row, "id": existing[row[upsert_on]]}
+            for row in values if upsert_on and row[upsert_on] in existing
+        ]
+
+        contact_ids: List[int] = []
+        if to_insert:
+            for row in to_insert:
+                row["created_at"] = now
+            db.execute(ContactDB.__table__.insert(), to_insert)
+            # The rows went in through one executemany inside our write
+            # transaction, so SQLite gave them consecutive rowids ending at
+            # last_insert_rowid() (triggers don't affect it)
+            last_id = db.execute(text("SELECT last_insert_rowid()")).scalar()
+            contact_ids = list(range(last_id - len(to_insert) + 1, last_id + 1))
+        if to_update:
+            db.execute(update(ContactDB), to_update)
+
+        # Initial transactions for every contact that came with an amount
+        pairs = list(zip(contact_ids, to_insert)) + [(row["id"], row) for row in to_update]
+        transactions = [
+            {"amount": row["last_transaction"], "note": transaction_note, "date": now, "contact_id": contact_id}
+            for contact_id, row in pairs if row["last_transaction"]
+        ]
+        if transactions:
+            db.execute(TransactionDB.__table__.insert(), transactions)
+            rollups.record_transactions(db, [(now, t["amount"]) for t in transactions])
+
+        return {"inserted": len(to_insert), "updated": len(to_update)}
+
     def get_transactions(self, db: Session, contact_id: int) -> List[Dict[str, Any]]:
         """Get all transactions for a contact"""
         transactions = db.query(TransactionDB).filter(TransactionDB.contact_id == contact_id).all()
@@ -137,25 +498,61 @@ class DBStore:
         if not transaction:
             return False
         
+        day = transaction.date
+        contact_id = transaction.contact_id
         db.delete(transaction)
+        db.flush()
+        if day is not None:
+            rollups.recompute_days(db, [day])
         db.commit()
+        self.invalidate_caches(counts=False)
+        # A transaction left behind by its contact has no contact to notify about
+        if contact_id is not None:
+            self.publish_change("delete_transaction", contact_id, {"id": transaction_id, "contact_id": contact_id})
+        self.publish_analytics_changed()
         return True
 
-    def get_contacts_count(self, db: Session, search: Optional[str] = None) -> int:
-        """Get the total count of contacts, applying any search filters"""
-        query = db.query(ContactDB)
-        
-        # Apply search filter if provided
-        if search:
-            search = search.lower()
-            query = query.filter(
-                (ContactDB.name.ilike(f"%{search}%")) |
-                (ContactDB.phone.ilike(f"%{search}%")) |
-                (ContactDB.tag.ilike(f"%{search}%"))
-            )
-        
-        # Return the count
-        return query.count()
+    def get_contacts_count(self, db: Session, search: Optional[str] = None, mode: str = "exact") -> Optional[int]:
+        """Get the total count of contacts, applying any search filters.
+
+        Counts are cached per normalized search term. mode="estimate" accepts a
+        stale cached value, or the highest contact id for a blank search,
+        instead of counting; mode="none" skips counting entirely.
+        """
+        if mode not in COUNT_MODES:
+            raise ValueError(f"Invalid count mode: {mode}")
+        if mode == "none":
+            return None
+
+        key = self._normalize_search(search)
+        count = self._cached_count(key, allow_stale=(mode == "estimate"))
+        if count is not None:
+            return count
+
+        if mode == "estimate" and not key:
+            # The highest id is an upper bound on the row count and is read
+            # straight from the primary key without a scan
+            return db.query(func.max(ContactDB.id)).scalar() or 0
+
+        query = self._apply_search(db.query(ContactDB), key)
+        count = query.count()
+        self._store_count(key, count)
+        return count
 
 # Create a global instance of the store
-db_store = DBStore() 
\ No newline at end of file
+db_store = DBStore()
+
+
+def _on_invalidation_event(topics, message):
+    # Brings writes made by other workers to this one; for this worker's own
+    # writes it merely repeats what invalidate_caches() already did
+    if INVALIDATION_TOPIC not in topics:
+        return
+    event = json.loads(message)
+    if event.get("type") == "caches_invalidated":
+        if event.get("counts"):
+            db_store.invalidate_counts()
+        analytics_cache.invalidate()
+
+
+event_bus.subscribe(_on_invalidation_event) 
\ No newline at end of file
@@ -0,0 +1,26 @@
+import time
+
+import pytest
+
+from backend.services.events import EventBus, SQLiteBackend
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.fixture
+def two_workers(tmp_path):
+    """Event buses of two workers sharing one SQLite notification table"""
+    path = str(tmp_path / "events.db")
+    writer, reader = EventBus(), EventBus()
+    writer.start(SQLiteBackend(path, poll_interval=0.01))
+    reader.start(SQLiteBackend(path, poll_interval=0.01))
+    yield writer, reader
+    writer.stop()
+    reader.stop()
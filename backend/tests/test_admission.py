@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+
+from backend.services.admission import client_key
+from backend.utils.auth import Principal, principal_cache
+
+ProxyHeadersMiddleware = pytest.importorskip("uvicorn.middleware.proxy_headers").ProxyHeadersMiddleware
+
+PROXY_IP = "172.28.0.10"
+
+
+def key_behind_proxy(peer: str, headers=()):
+    """client_key() as the admission middleware sees it when uvicorn trusts PROXY_IP"""
+    keys = []
+
+    async def app(scope, receive, send):
+        keys.append(client_key(scope))
+
+    scope = {
+        "type": "http",
+        "path": "/api/auth/login",
+        "method": "POST",
+        "client": (peer, 50000),
+        "headers": [(name.encode(), value.encode()) for name, value in headers],
+    }
+    asyncio.run(ProxyHeadersMiddleware(app, trusted_hosts=PROXY_IP)(scope, None, None))
+    return keys[0]
+
+
+def test_clients_behind_the_proxy_get_their_own_bucket():
+    assert key_behind_proxy(PROXY_IP, [("x-forwarded-for", "203.0.113.7")]) == "ip:203.0.113.7"
+    assert key_behind_proxy(PROXY_IP, [("x-forwarded-for", "198.51.100.2")]) == "ip:198.51.100.2"
+
+
+def test_forwarded_header_ignored_from_untrusted_peers():
+    # Someone reaching the backend directly cannot choose their bucket
+    assert key_behind_proxy("203.0.113.7", [("x-forwarded-for", "198.51.100.2")]) == "ip:203.0.113.7"
+
+
+def test_authenticated_clients_keyed_by_user():
+    principal_cache.put("token-1", Principal(user_id=7, username="alice", role="user"), None)
+    try:
+        headers = [("x-forwarded-for", "203.0.113.7"), ("authorization", "Bearer token-1")]
+        assert key_behind_proxy(PROXY_IP, headers) == "user:7"
+    finally:
+        principal_cache.invalidate_user(7)
@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from backend.models.contact import ContactDB, TransactionDB
+from backend.routes.analytics import top_contacts
+
+
+@pytest.fixture
+def db(tmp_path):
+    bind = create_engine(f"sqlite:///{tmp_path / 'analytics.db'}")
+    ContactDB.__table__.create(bind)
+    TransactionDB.__table__.create(bind)
+    session = sessionmaker(bind=bind)()
+    now = datetime.now()
+    for i in range(1, 6):
+        session.add(ContactDB(id=i, name=f"Contact {i}", phone=f"07{i:08d}", email=f"c{i}@example.com"))
+    # Contact 1 was busiest long ago, contacts 2 and 3 this week
+    session.add_all(TransactionDB(contact_id=1, amount=10, date=now - timedelta(days=60)) for _ in range(5))
+    session.add_all(TransactionDB(contact_id=2, amount=1, date=now - timedelta(days=2)) for _ in range(3))
+    session.add(TransactionDB(contact_id=3, amount=50, date=now - timedelta(days=3)))
+    session.commit()
+    yield session
+    session.close()
+
+
+def test_top_contacts_only_count_the_period(db):
+    by_volume, by_amount = top_contacts(db, datetime.now() - timedelta(weeks=1))
+    assert [(c.id, c.transaction_count) for c in by_volume] == [(2, 3), (3, 1)]
+    assert [(c.id, c.total_amount) for c in by_amount] == [(3, 50), (2, 3)]
+
+    by_volume, _ = top_contacts(db, None)
+    assert [c.id for c in by_volume] == [1, 2, 3]
+
+
+def test_period_is_read_from_its_date_range(db):
+    statements = []
+    bind = db.get_bind()
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(bind, "before_cursor_execute", capture)
+    try:
+        top_contacts(db, datetime.now() - timedelta(days=1))
+    finally:
+        event.remove(bind, "before_cursor_execute", capture)
+
+    statement, parameters = statements[-1]
+    with bind.connect() as conn:
+        plan = " ".join(row[3] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters))
+    assert "SEARCH transactions USING COVERING INDEX ix_transactions_date_contact_amount (date>?)" in plan
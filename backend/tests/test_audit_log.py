@@ -0,0 +1,28 @@
+import threading
+import time
+
+from backend.services.audit_log import AuditLogWriter
+
+
+def test_stop_gives_up_after_timeout_when_writer_is_stuck(monkeypatch):
+    writer = AuditLogWriter(batch_size=1, max_queue=2)
+    stuck = threading.Event()
+    monkeypatch.setattr(writer, "_write", lambda batch: stuck.wait(5))
+    for i in range(5):
+        writer.record(1, "create_contact", f"Contact ID: {i}")
+
+    start = time.monotonic()
+    writer.stop(timeout=0.3)
+    assert time.monotonic() - start < 1
+    stuck.set()
+
+
+def test_stop_writes_everything_queued(monkeypatch):
+    writer = AuditLogWriter(batch_size=10, flush_ms=1000)
+    written = []
+    monkeypatch.setattr(writer, "_write", written.extend)
+    for i in range(25):
+        writer.record(1, "create_contact", f"Contact ID: {i}")
+
+    writer.stop()
+    assert len(written) == 25
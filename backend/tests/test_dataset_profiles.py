@@ -0,0 +1,27 @@
+from datetime import datetime
+
+import pytest
+
+from backend.dataset_profiles import ProfileSampler, load_profile
+
+
+def test_builtin_profiles_load():
+    assert load_profile("realistic")["dates"]["bursts"] == {"count": 6, "factor": 5}
+
+
+@pytest.mark.parametrize("dates", [
+    {"month_weights": [0] * 12},
+    {"weekday_weights": [1, 1, 1, 1, 1, 1, -1]},
+    {"bursts": {"count": -1, "factor": 2}},
+    {"bursts": {"count": 3, "factor": -2}},
+])
+def test_invalid_weights_rejected(dates):
+    with pytest.raises(ValueError, match="dates\\."):
+        load_profile("uniform", {"dates": dates})
+
+
+def test_range_with_no_weight_rejected():
+    # Only Sundays count, but a range of Tuesday and Wednesday has none
+    profile = load_profile("uniform", {"dates": {"days": 1, "weekday_weights": [0, 0, 0, 0, 0, 0, 1]}})
+    with pytest.raises(ValueError, match="No day in the date range"):
+        ProfileSampler(profile, datetime(2024, 1, 3), burst_seed=1)
@@ -0,0 +1,132 @@
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from backend.models.contact import ContactDB, ContactUpdate, TransactionDB
+from backend.models.rollup import TransactionDailyRollup
+from backend.models.search import create_search_index
+from backend.services.events import EventBus, CONTACTS_TOPIC
+from backend.store import db_store as db_store_module
+from backend.store.db_store import db_store
+
+
+@pytest.fixture
+def db(tmp_path):
+    bind = create_engine(f"sqlite:///{tmp_path / 'contacts.db'}")
+    ContactDB.__table__.create(bind)
+    TransactionDB.__table__.create(bind)
+    TransactionDailyRollup.__table__.create(bind)
+    create_search_index(bind)
+    session = sessionmaker(bind=bind)()
+    now = datetime.now()
+    for name, phone in [("Foo Bar", "0711111111"), ("Other Person", "0722222222")]:
+        session.add(ContactDB(name=name, phone=phone, email=f"{phone}@example.com", created_at=now, updated_at=now))
+    session.commit()
+    db_store.invalidate_counts()
+    yield session
+    session.close()
+    db_store.invalidate_counts()
+
+
+@pytest.mark.parametrize("search", ["foo", " Foo", "FOO  ", "  bar"])
+def test_page_and_count_agree_for_equivalent_searches(db, search):
+    page = db_store.get_contacts_page(db, search)
+    assert [item["name"] for item in page["items"]] == ["Foo Bar"]
+    assert db_store.get_contacts_count(db, search) == 1
+
+
+@pytest.fixture
+def contact_events(monkeypatch):
+    bus = EventBus()
+    events = []
+    bus.subscribe(lambda topics, message: events.append((topics, json.loads(message))) if CONTACTS_TOPIC in topics else None)
+    bus.start()
+    monkeypatch.setattr(db_store_module, "event_bus", bus)
+    return events
+
+
+def test_rename_is_one_write_and_one_event(db, contact_events):
+    contact = db.query(ContactDB).filter_by(name="Foo Bar").one()
+    updated = db_store.update_contact(db, contact.id, ContactUpdate(name="Baz Qux"), retag=True)
+
+    assert updated["tag"] == "Ba11ux"
+    assert len(contact_events) == 1
+    topics, event = contact_events[0]
+    assert event["type"] == "update_contact" and event["data"]["tag"] == "Ba11ux"
+
+
+def test_orphaned_transaction_deleted_without_contact_event(db, contact_events):
+    transaction = TransactionDB(amount=5, note="left behind", date=datetime.now(), contact_id=None)
+    db.add(transaction)
+    db.commit()
+
+    assert db_store.delete_transaction(db, transaction.id)
+    assert contact_events == []
+
+
+@pytest.fixture
+def many_contacts(db):
+    now = datetime.now()
+    for i in range(45):
+        # Repeated names and NULL tags/amounts so ties and the NULL range are crossed
+        db.add(ContactDB(
+            name=f"Name {i % 7}", phone=f"07{i:08d}", email=f"c{i}@example.com",
+            tag=None if i % 3 == 0 else f"t{i % 5}",
+            last_transaction=None if i % 4 == 0 else float(i % 6),
+            created_at=now, updated_at=now
+        ))
+    db.commit()
+    return db
+
+
+def _ids(page):
+    return [item["id"] for item in page["items"]]
+
+
+@pytest.mark.parametrize("search", ["", "name"])
+def test_second_page_by_number(many_contacts, search):
+    first = db_store.get_contacts_page(many_contacts, search, "name", limit=10, page=1)
+    second = db_store.get_contacts_page(many_contacts, search, "name", limit=10, page=2)
+    everything = db_store.get_contacts_page(many_contacts, search, "name", limit=100)
+
+    assert len(second["items"]) == 10
+    assert _ids(first) + _ids(second) == _ids(everything)[:20]
+
+
+@pytest.mark.parametrize("sort", ["id", "-id", "name", "-name", "tag", "-tag", "last_transaction", "-last_transaction"])
+def test_cursor_pages_match_full_ordering(many_contacts, sort):
+    expected = _ids(db_store.get_contacts_page(many_contacts, None, sort, limit=100))
+    seen, cursor = [], None
+    while True:
+        page = db_store.get_contacts_page(many_contacts, None, sort, limit=4, cursor=cursor)
+        seen += _ids(page)
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == expected
+
+
+@pytest.mark.parametrize("sort", ["name", "-name", "last_transaction", "-last_transaction"])
+def test_cursor_seeks_into_the_sort_index(many_contacts, sort):
+    cursor = db_store.get_contacts_page(many_contacts, None, sort, limit=4)["next_cursor"]
+    statements = []
+    bind = many_contacts.get_bind()
+
+    def capture(conn, cursor_, statement, parameters, context, executemany):
+        if statement.lstrip().startswith("SELECT") and "FROM contacts" in statement:
+            statements.append((statement, parameters))
+
+    event.listen(bind, "before_cursor_execute", capture)
+    try:
+        db_store.get_contacts_page(many_contacts, None, sort, limit=4, cursor=cursor)
+    finally:
+        event.remove(bind, "before_cursor_execute", capture)
+
+    statement, parameters = statements[0]
+    with bind.connect() as conn:
+        plan = " ".join(row[3] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters))
+    column = sort.lstrip("-")
+    assert f"SEARCH contacts USING INDEX ix_contacts_{column} ({column}" in plan
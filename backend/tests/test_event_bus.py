@@ -0,0 +1,35 @@
+from backend.services.analytics_cache import analytics_cache
+from backend.store import db_store as db_store_module
+from backend.store.db_store import db_store
+
+from conftest import wait_for
+
+
+def test_write_in_one_worker_invalidates_caches_in_another(two_workers, monkeypatch):
+    writer, reader = two_workers
+    # The second worker listens the way every worker's db_store does
+    reader.subscribe(db_store_module._on_invalidation_event)
+    monkeypatch.setattr(db_store_module, "event_bus", writer)
+
+    # The writer's write path clears this process's caches straight away;
+    # the entries cached after it stand in for the reader's cached state,
+    # which only the notification can clear
+    db_store.invalidate_caches()
+    version = analytics_cache.version
+    db_store._store_count("", 42)
+
+    assert wait_for(lambda: analytics_cache.version > version)
+    assert wait_for(lambda: db_store._cached_count("") is None)
+
+
+def test_count_only_invalidated_when_asked(two_workers, monkeypatch):
+    writer, reader = two_workers
+    reader.subscribe(db_store_module._on_invalidation_event)
+    monkeypatch.setattr(db_store_module, "event_bus", writer)
+
+    db_store.invalidate_caches(counts=False)
+    version = analytics_cache.version
+    db_store._store_count("", 42)
+
+    assert wait_for(lambda: analytics_cache.version > version)
+    assert db_store._cached_count("") == 42
@@ -0,0 +1,49 @@
+import os
+import tempfile
+import threading
+
+from backend.services import jobs
+from backend.services.events import JOBS_TOPIC, job_topic
+from backend.services.jobs import JobManager, job_manager
+
+from conftest import wait_for
+
+
+def test_job_of_another_worker_can_be_looked_up(two_workers):
+    writer, reader = two_workers
+    reader.subscribe(jobs._on_job_event)
+
+    writer.publish([JOBS_TOPIC, job_topic("abc123")], {
+        "type": "job_progress", "data": {"id": "abc123", "status": "running", "rows_processed": 500}
+    })
+
+    assert wait_for(lambda: job_manager.get("abc123") is not None)
+    assert job_manager.get("abc123")["rows_processed"] == 500
+
+
+def test_shutdown_removes_uploads_of_cancelled_jobs(monkeypatch):
+    release = threading.Event()
+
+    def blocked_import(db, stream, upsert_on=None, on_progress=None):
+        release.wait(5)
+        return {"rows": 0, "inserted": 0, "updated": 0, "error_count": 0, "errors": []}
+
+    monkeypatch.setattr(jobs, "import_contacts_csv", blocked_import)
+    manager = JobManager(workers=1)
+    paths = []
+    for _ in range(2):
+        fd, path = tempfile.mkstemp(suffix=".csv")
+        os.close(fd)
+        paths.append(path)
+
+    running = manager.submit_import(paths[0], "a.csv")
+    queued = manager.submit_import(paths[1], "b.csv")
+    assert wait_for(lambda: manager.get(running.id)["status"] == "running")
+    manager.shutdown()
+    release.set()
+
+    assert manager.get(queued.id)["status"] == "cancelled"
+    assert not os.path.exists(paths[1])
+    # The running job still finishes and cleans up after itself
+    assert wait_for(lambda: manager.get(running.id)["status"] == "completed")
+    assert not os.path.exists(paths[0])
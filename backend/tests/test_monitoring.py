@@ -0,0 +1,22 @@
+import pytest
+
+from backend.services.monitoring import ActivityMonitor, parse_rules
+
+
+def test_rules_parsed():
+    assert parse_rules("*=1/18, delete_contact=5/60") == {"*": (1, 18.0), "delete_contact": (5, 60.0)}
+
+
+@pytest.mark.parametrize("spec", ["*=-1/18", "*=0/18", "*=3/0", "*=3/-5", "=3/18", "*=3", "*=a/18"])
+def test_invalid_rules_rejected(spec):
+    with pytest.raises(ValueError, match="Invalid monitoring rule"):
+        parse_rules(spec)
+
+
+def test_user_flagged_once_over_threshold():
+    monitor = ActivityMonitor(parse_rules("*=2/60"))
+    monitor.record(1, "create_contact")
+    monitor.record(1, "create_contact")
+    assert 1 not in monitor._flagged
+    monitor.record(1, "create_contact")
+    assert 1 in monitor._flagged
@@ -0,0 +1,40 @@
+import os
+import time
+
+import pytest
+
+from backend.services import passwords
+from backend.services.passwords import PasswordHasher, PasswordHasherBusy, build_context
+
+
+def test_rounds_default_to_the_schemes_own():
+    assert build_context("sha256_crypt").to_dict()["sha256_crypt__default_rounds"] == 535000
+    assert build_context("bcrypt").to_dict()["bcrypt__default_rounds"] == 12
+
+
+def test_rounds_out_of_range_for_scheme_rejected():
+    with pytest.raises(ValueError, match="out of range for bcrypt"):
+        build_context("bcrypt", 535000)
+
+
+def test_timeout_reported_as_busy(monkeypatch):
+    monkeypatch.setattr(passwords, "PASSWORD_TIMEOUT", 0.2)
+    hasher = PasswordHasher(workers=1, max_pending=4)
+    try:
+        with pytest.raises(PasswordHasherBusy):
+            hasher._submit(time.sleep, 2)
+        assert hasher.stats()["rejected"] == 1
+    finally:
+        hasher.shutdown()
+
+
+def test_pool_restarted_after_worker_dies():
+    hasher = PasswordHasher(workers=1, max_pending=4)
+    try:
+        # The worker exits mid-call, like an OOM kill
+        with pytest.raises(PasswordHasherBusy):
+            hasher._submit(os._exit, 1)
+        assert hasher._submit(abs, -3) == 3
+        assert hasher.stats()["restarts"] == 1
+    finally:
+        hasher.shutdown()
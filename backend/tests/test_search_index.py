@@ -0,0 +1,35 @@
+from sqlalchemy import create_engine, text
+
+from backend.models.contact import ContactDB
+from backend.models.search import FTS_TABLE, INSERT_TRIGGER, create_search_index
+
+
+def indexed_ids(bind, term):
+    with bind.connect() as conn:
+        return {row[0] for row in conn.execute(text(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :term"), {"term": term})}
+
+
+def add_contact(bind, contact_id, name):
+    with bind.begin() as conn:
+        conn.execute(ContactDB.__table__.insert(), {
+            "id": contact_id, "name": name, "phone": f"07000000{contact_id:02d}", "email": f"c{contact_id}@example.com"
+        })
+
+
+def test_interrupted_bulk_load_is_indexed_on_next_start(tmp_path):
+    bind = create_engine(f"sqlite:///{tmp_path / 'contacts.db'}")
+    ContactDB.__table__.create(bind)
+    assert create_search_index(bind)
+    add_contact(bind, 1, "Alice Example")
+
+    # A bulk load drops the insert trigger, writes rows and dies before rebuilding
+    with bind.begin() as conn:
+        conn.exec_driver_sql(f"DROP TRIGGER {INSERT_TRIGGER}")
+    add_contact(bind, 2, "Bob Example")
+    assert indexed_ids(bind, "Example") == {1}
+
+    create_search_index(bind)
+    assert indexed_ids(bind, "Example") == {1, 2}
+    # The trigger is back, so later inserts are indexed as they happen
+    add_contact(bind, 3, "Carol Example")
+    assert indexed_ids(bind, "Example") == {1, 2, 3}
@@ -0,0 +1,73 @@
+import asyncio
+import hashlib
+
+import pytest
+from starlette.requests import Request
+
+from backend.services.uploads import InvalidUpload, UploadTooLarge, store_upload
+
+BOUNDARY = "testboundary"
+
+
+def multipart_body(content: bytes, filename: str = "clip.MP4", field: str = "file") -> bytes:
+    return (
+        f"--{BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="note"\r\n\r\nhello\r\n'
+        f"--{BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+        f"Content-Type: application/octet-stream\r\n\r\n"
+    ).encode() + content + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+def upload_request(body: bytes, chunk_size: int = 1000, content_length: bool = True):
+    """A request whose body arrives in chunks; `received` counts the chunks read"""
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]
+    received = []
+
+    async def receive():
+        chunk = chunks[len(received)]
+        received.append(chunk)
+        return {"type": "http.request", "body": chunk, "more_body": len(received) < len(chunks)}
+
+    headers = [(b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode())]
+    if content_length:
+        headers.append((b"content-length", str(len(body)).encode()))
+    return Request({"type": "http", "method": "POST", "headers": headers}, receive), received
+
+
+def store(request, tmp_path, max_size=None):
+    return asyncio.run(store_upload(request, tmp_path / "uploads", max_size, tmp_dir=tmp_path / "tmp"))
+
+
+def test_upload_stored_under_its_hash(tmp_path):
+    content = bytes(range(256)) * 40
+    sha = hashlib.sha256(content).hexdigest()
+
+    result = store(upload_request(multipart_body(content))[0], tmp_path)
+    assert result["path"] == f"/uploads/{sha[:2]}/{sha}.mp4"
+    assert (tmp_path / "uploads" / sha[:2] / f"{sha}.mp4").read_bytes() == content
+    assert result["size"] == len(content) and not result["deduplicated"]
+    assert list((tmp_path / "tmp").iterdir()) == []
+
+    assert store(upload_request(multipart_body(content))[0], tmp_path)["deduplicated"]
+
+
+def test_oversized_content_length_rejected_before_reading(tmp_path):
+    request, received = upload_request(multipart_body(b"x" * 200_000))
+    with pytest.raises(UploadTooLarge):
+        store(request, tmp_path, max_size=10_000)
+    assert received == []
+
+
+def test_oversized_stream_stopped_part_way(tmp_path):
+    body = multipart_body(b"x" * 200_000)
+    request, received = upload_request(body, content_length=False)
+    with pytest.raises(UploadTooLarge):
+        store(request, tmp_path, max_size=10_000)
+    assert sum(map(len, received)) < len(body) / 10
+    assert list((tmp_path / "tmp").iterdir()) == []
+
+
+def test_request_without_the_file_field(tmp_path):
+    with pytest.raises(InvalidUpload):
+        store(upload_request(multipart_body(b"data", field="other"))[0], tmp_path)
@@ -0,0 +1,70 @@
+import asyncio
+import json
+
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import WebSocketRoute
+from starlette.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect, WebSocketState
+
+from backend.services import websocket as websocket_module
+from backend.services.websocket import CLOSE_SLOW_CONSUMER, CLOSE_TRY_AGAIN_LATER, Connection, ConnectionManager
+
+
+@pytest.fixture
+def manager():
+    return ConnectionManager()
+
+
+@pytest.fixture
+def client(manager):
+    return TestClient(Starlette(routes=[WebSocketRoute("/ws", manager.serve)]))
+
+
+def test_over_capacity_client_gets_close_code(client, manager, monkeypatch):
+    monkeypatch.setattr(websocket_module, "WS_MAX_CONNECTIONS", 0)
+    with client.websocket_connect("/ws") as ws:
+        with pytest.raises(WebSocketDisconnect) as closed:
+            ws.receive_text()
+    assert closed.value.code == CLOSE_TRY_AGAIN_LATER
+    assert manager.stats()["rejected"] == 1
+
+
+def test_connection_released_when_the_handler_fails(client, manager):
+    with pytest.raises(KeyError):
+        with client.websocket_connect("/ws") as ws:
+            ws.send_text(json.dumps({"type": "subscribe", "topics": ["contacts"]}))
+            assert json.loads(ws.receive_text())["type"] == "subscribed"
+            # receive_text() fails on a binary frame
+            ws.send_bytes(b"\x00")
+            ws.receive_text()
+    assert manager.active_connections == {}
+    assert manager.subscribers == {}
+
+
+
+class FakeWebSocket:
+    application_state = WebSocketState.CONNECTED
+
+    def __init__(self):
+        self.close_code = None
+
+    async def close(self, code):
+        self.close_code = code
+
+
+def test_evicted_client_closed_by_a_tracked_task(manager):
+    async def evict():
+        websocket = FakeWebSocket()
+        connection = Connection(websocket)
+        manager.active_connections[websocket] = connection
+        manager._evict(connection, CLOSE_SLOW_CONSUMER)
+        closing = list(manager._closing)
+        assert len(closing) == 1
+        await asyncio.gather(*closing)
+        await asyncio.sleep(0)
+        return websocket
+
+    websocket = asyncio.run(evict())
+    assert websocket.close_code == CLOSE_SLOW_CONSUMER
+    assert manager._closing == set()
@@ -0,0 +1,180 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Set, Tuple
+
+import jwt
+from fastapi import Depends, Header, HTTPException
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+
+from backend.models.database import get_db
+from backend.models.user import UserDB
+from backend.routes.auth import SECRET_KEY, ALGORITHM
+from backend.services.events import event_bus, INVALIDATION_TOPIC
+
+# Verified tokens kept in memory, and how many seconds one is trusted without
+# looking the user up again (an entry also expires with its token)
+PRINCIPAL_CACHE_SIZE = int(os.environ.get("PRINCIPAL_CACHE_SIZE", "10000"))
+PRINCIPAL_CACHE_TTL = float(os.environ.get("PRINCIPAL_CACHE_TTL", "300"))
+
+
+@dataclass(frozen=True)
+class Principal:
+    user_id: int
+    username: str
+    role: str
+
+
+class PrincipalCache:
+    """
+    LRU of verified JWTs and the user they belong to.
+
+    A cached token skips signature verification and the user lookup. Entries
+    expire when the token's `exp` passes (or after PRINCIPAL_CACHE_TTL), and
+    all of a user's entries are dropped when the user is deleted or their
+    role or username changes.
+    """
+
+    def __init__(self, max_size: int = PRINCIPAL_CACHE_SIZE, ttl: float = PRINCIPAL_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[Principal, float]]" = OrderedDict()
+        self._tokens_by_user: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None:
+                principal, expires_at = entry
+                if expires_at > time.time():
+                    self._entries.move_to_end(token)
+                    self.hits += 1
+                    return principal
+                self._remove(token)
+            self.misses += 1
+            return None
+
+    def put(self, token: str, principal: Principal, token_exp: Optional[float]):
+        expires_at = time.time() + self.ttl
+        if token_exp is not None:
+            expires_at = min(expires_at, token_exp)
+        with self._lock:
+            self._entries[token] = (principal, expires_at)
+            self._entries.move_to_end(token)
+            self._tokens_by_user.setdefault(principal.user_id, set()).add(token)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, token: str):
+        principal, _ = self._entries.pop(token)
+        tokens = self._tokens_by_user.get(principal.user_id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[principal.user_id]
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            for token in list(self._tokens_by_user.get(user_id, ())):
+                self._remove(token)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# Create a global instance of the cache
+principal_cache = PrincipalCache()
+
+
+def get_current_principal(authorization: str = Header(...), db: Session = Depends(get_db)) -> Principal:
+    """Authenticate the request's bearer token, from the cache when possible"""
+    parts = authorization.split()
+    if len(parts) != 2 or parts[0].lower() != "bearer":
+        raise HTTPException(status_code=401, detail="Invalid or missing token")
+    token = parts[1]
+
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        user_id = int(payload["user_id"])
+    except Exception:
+        raise HTTPException(status_code=401, detail="Invalid or missing token")
+    user = db.query(UserDB).filter(UserDB.id == user_id).first()
+    if user is None:
+        raise HTTPException(status_code=401, detail="Invalid or missing token")
+
+    principal = Principal(user_id=user.id, username=user.username, role=user.role or "user")
+    principal_cache.put(token, principal, payload.get("exp"))
+    return principal
+
+
+def get_current_user_id(principal: Principal = Depends(get_current_principal)) -> int:
+    return principal.user_id
+
+
+def require_admin(principal: Principal = Depends(get_current_principal)) -> Principal:
+    if principal.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return principal
+
+
+# Invalidation: users deleted or changed through the ORM are collected per
+# session and dropped from every worker's cache once the change is committed
+
+def _mark_changed(target: UserDB):
+    Session.object_session(target).info.setdefault("changed_user_ids", set()).add(target.id)
+
+
+@event.listens_for(UserDB, "after_delete")
+def _user_deleted(mapper, connection, target):
+    _mark_changed(target)
+
+
+@event.listens_for(UserDB, "after_update")
+def _user_updated(mapper, connection, target):
+    if any(get_history(target, name).has_changes() for name in ("role", "username")):
+        _mark_changed(target)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_user_changes(session):
+    user_ids = session.info.pop("changed_user_ids", None)
+    if not user_ids:
+        return
+    for user_id in user_ids:
+        principal_cache.invalidate_user(user_id)
+    event_bus.publish([INVALIDATION_TOPIC], {"type": "principals_invalidated", "user_ids": sorted(user_ids)})
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_user_changes(session):
+    session.info.pop("changed_user_ids", None)
+
+
+def _on_auth_event(topics, message):
+    if INVALIDATION_TOPIC not in topics:
+        return
+    event = json.loads(message)
+    if event.get("type") == "principals_invalidated":
+        for user_id in event["user_ids"]:
+            principal_cache.invalidate_user(user_id)
+
+
+event_bus.subscribe(_on_auth_event)
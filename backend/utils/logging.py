@@ -1,8 +1,9 @@
-from backend.models.log import LogEntry
+from backend.services.audit_log import audit_log
+from backend.services.monitoring import activity_monitor
 from sqlalchemy.orm import Session
 from typing import Optional
 
 def log_action(db: Session, user_id: int, action: str, details: Optional[str] = None):
-    log = LogEntry(user_id=user_id, action=action, details=details)
-    db.add(log)
-    db.commit() 
\ No newline at end of file
+    # Written in the background in group commits, not in the request's transaction
+    audit_log.record(user_id, action, details)
+    activity_monitor.record(user_id, action)
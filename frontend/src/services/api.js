@@ -86,14 +86,27 @@ class WebSocketManager {
     constructor() {
         this.ws = null;
         this.listeners = [];
+        this.topics = new Map();
         this.connect();
     }
 
     connect() {
         this.ws = new WebSocket(WS_URL);
+
+        // (Re)subscribe to every topic still in use after (re)connecting
+        this.ws.onopen = () => {
+            if (this.topics.size) {
+                this.send({ type: 'subscribe', topics: [...this.topics.keys()] });
+            }
+        };
         
         this.ws.onmessage = (event) => {
             const data = JSON.parse(event.data);
+            // Answer server heartbeats so the connection isn't dropped as dead
+            if (data && data.type === 'ping') {
+                this.send({ type: 'pong' });
+                return;
+            }
             this.listeners.forEach(listener => listener(data));
         };
 
@@ -109,6 +122,27 @@ class WebSocketManager {
         };
     }
 
+    // Receive events for the given topics (e.g. 'contacts', 'contact:12',
+    // 'analytics'); returns a function that drops the subscription
+    subscribe(topics) {
+        const added = topics.filter(topic => !this.topics.has(topic));
+        topics.forEach(topic => this.topics.set(topic, (this.topics.get(topic) || 0) + 1));
+        if (added.length) this.send({ type: 'subscribe', topics: added });
+
+        return () => {
+            const removed = topics.filter(topic => {
+                const count = this.topics.get(topic) - 1;
+                if (count > 0) {
+                    this.topics.set(topic, count);
+                    return false;
+                }
+                this.topics.delete(topic);
+                return true;
+            });
+            if (removed.length) this.send({ type: 'unsubscribe', topics: removed });
+        };
+    }
+
     send(data) {
         if (this.ws.readyState === WebSocket.OPEN) {
             this.ws.send(JSON.stringify(data));
@@ -161,7 +195,6 @@ export const api = {
             });
             if (!response.ok) throw new Error('Failed to create contact');
             const result = await response.json();
-            wsManager.send({ type: 'new_contact', data: result });
             return result;
         } catch (error) {
             console.error('Network error:', error);
@@ -180,7 +213,6 @@ export const api = {
             });
             if (!response.ok) throw new Error('Failed to update contact');
             const result = await response.json();
-            wsManager.send({ type: 'update_contact', data: result });
             return result;
         } catch (error) {
             console.error('Network error:', error);
@@ -198,7 +230,6 @@ export const api = {
             });
             if (!response.ok) throw new Error('Failed to delete contact');
             const result = await response.json();
-            wsManager.send({ type: 'delete_contact', data: { id } });
             return result;
         } catch (error) {
             console.error('Network error:', error);
@@ -220,7 +251,6 @@ export const api = {
             });
             if (!response.ok) throw new Error('Failed to add transaction');
             const result = await response.json();
-            wsManager.send({ type: 'new_transaction', data: { id, amount, note } });
             return result;
         } catch (error) {
             console.error('Network error:', error);
@@ -278,6 +308,26 @@ export const api = {
             throw error;
         }
     },
+
+    // Get the state of a background job (e.g. a CSV import)
+    async getJob(jobId) {
+        const response = await fetch(`${API_URL}/jobs/${jobId}`);
+        if (!response.ok) {
+            throw new Error('Failed to fetch job status');
+        }
+        return response.json();
+    },
+
+    // Poll a background job until it has finished and return its final state
+    async waitForJob(jobId, interval = 1000) {
+        for (;;) {
+            const job = await this.getJob(jobId);
+            if (['completed', 'failed', 'cancelled'].includes(job.status)) {
+                return job;
+            }
+            await new Promise(resolve => setTimeout(resolve, interval));
+        }
+    },
     
     // Download sample CSV template
     downloadSampleCSV() {